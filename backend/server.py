@@ -1,19 +1,45 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+import jwt
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 from fastapi import Request
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi import Response
 import traceback
+import gzip
+import hashlib
+import json
+import re
+import time
+import random
+import contextvars
+import functools
+import orjson
+import brotli
+
+from collections import defaultdict, deque, OrderedDict, Counter
+from contextlib import nullcontext
+from types import MappingProxyType
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 app = FastAPI()
 
@@ -44,38 +70,6 @@ db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
 app = FastAPI()
-# début nouveau
-@app.post("/profile")
-async def create_profile(request: Request):
-    data = await request.json()
-    print("Données reçues pour le profil :", data)
-
-    # Réponse simulée
-    return {
-        "message": "Profil créé avec succès (mode test)",
-        "data": data
-    }
-
-@app.post("/login")
-async def login(request: Request):
-    data = await request.json()
-    print("Tentative de connexion :", data)
-
-    # Simulation de vérification
-    if data.get("email") == "test@example.com" and data.get("password") == "1234":
-        return {
-            "message": "Connexion réussie (mode test)",
-            "user": {
-                "id": "fake-user-id",
-                "name": "Utilisateur Test",
-                "email": data["email"]
-            }
-        }
-    else:
-        return {
-            "message": "Email ou mot de passe incorrect (mode test)"
-        }
-# fin nouveau
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -84,11 +78,24 @@ class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     email: str
     name: str
+    locale: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class UserCreate(BaseModel):
     email: str
     name: str
+    password: Optional[str] = None
+    locale: Optional[str] = None
+
+class LoginRequest(BaseModel):
+    email: str
+    password: str
+
+class LoginResponse(BaseModel):
+    message: str
+    access_token: str
+    token_type: str = "bearer"
+    user: User
 
 class MoodEntry(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -107,6 +114,7 @@ class AIResponseRequest(BaseModel):
     mood: str
     intensity: int
     message: Optional[str] = None
+    locale: Optional[str] = None
 
 class AIResponse(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -131,136 +139,941 @@ class ChatRequest(BaseModel):
     message: str
     current_mood: str
     mood_intensity: int
+    locale: Optional[str] = None
+
+class ProfilingSettings(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(default=0.0, ge=0.0, le=1.0)
+
+class ProfilingStatus(ProfilingSettings):
+    profiled_requests: int
+    stacks: int
+
+class UsageSummary(BaseModel):
+    key: str
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+# Fast path for history endpoints: projected Mongo documents are serialized
+# directly with orjson, without building Pydantic models twice.
+MOOD_ENTRY_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "mood": 1, "intensity": 1, "timestamp": 1}
+AI_RESPONSE_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "mood": 1, "intensity": 1, "ai_response": 1, "timestamp": 1}
+CHAT_MESSAGE_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "session_id": 1, "user_message": 1,
+    "ai_response": 1, "mood_context": 1, "timestamp": 1
+}
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+
+def parse_accept_encoding(accept_encoding: str) -> dict:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+def choose_encoding(accept_encoding: str):
+    """Pick the best content encoding supported by both client and server"""
+    qualities = parse_accept_encoding(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    # q=0 means the client refuses the coding; on equal q-values prefer brotli
+    best = max(("br", "gzip"), key=lambda coding: qualities.get(coding, wildcard))
+    return best if qualities.get(best, wildcard) > 0 else None
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def fast_json_response(request: Request, documents: list) -> Response:
+    """Serialize documents with orjson, honoring If-None-Match and Accept-Encoding"""
+    body = orjson.dumps(documents)
+    # Weak ETag: the same tag is sent for the identity, gzip and brotli bodies
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if len(body) >= COMPRESSION_MIN_SIZE:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding == "br":
+            body = brotli.compress(body)
+            headers["Content-Encoding"] = "br"
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Authentication
+# Password hashing is CPU-bound, so it always runs in the thread pool
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+JWT_SECRET = os.environ.get('JWT_SECRET')
+if not JWT_SECRET:
+    # A per-process secret breaks tokens across workers and restarts: only for local development
+    if os.environ.get('JWT_DEV_SECRET', '').lower() not in ("1", "true", "yes"):
+        raise RuntimeError("JWT_SECRET must be set (or JWT_DEV_SECRET=1 for local development)")
+    JWT_SECRET = uuid.uuid4().hex + uuid.uuid4().hex
+    logging.warning("Using a random development JWT_SECRET, tokens will not survive a restart")
+JWT_ALGORITHM = "HS256"
+JWT_EXPIRE_MINUTES = int(os.environ.get('JWT_EXPIRE_MINUTES', '1440'))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '300'))
+USER_PROJECTION = {"_id": 0, "password_hash": 0}
+# Verified when the email is unknown, so login takes the same time either way
+DUMMY_PASSWORD_HASH = pwd_context.hash(uuid.uuid4().hex)
+
+class TTLCache:
+    """Small in-process LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+user_cache = TTLCache(USER_CACHE_TTL)
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def create_access_token(user_id: str) -> str:
+    payload = {"sub": user_id, "exp": datetime.utcnow() + timedelta(minutes=JWT_EXPIRE_MINUTES)}
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+async def load_user(user_id: str) -> Optional[User]:
+    """Get a user from the TTL cache, falling back to Mongo"""
+    user = user_cache.get(user_id)
+    if user is None:
+        user_doc = await db.users.find_one({"id": user_id}, USER_PROJECTION)
+        if not user_doc:
+            return None
+        user = User(**user_doc)
+        user_cache.set(user_id, user)
+    return user
+
+async def get_current_user(authorization: Optional[str] = Header(None)) -> Optional[User]:
+    """Resolve the bearer token, if any, to a user; anonymous requests get None"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    user = await load_user(payload.get("sub", ""))
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return user
+
+def ensure_same_user(current_user: Optional[User], user_id: str):
+    if current_user is not None and current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Token does not match user_id")
+
+# Hot-path profiling: sampled requests record nested span timings that are
+# aggregated as collapsed stacks (flamegraph.pl / speedscope input). When
+# profiling is disabled, span() returns a shared no-op context manager.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+_NO_SPAN = nullcontext()
+
+def route_path(scope) -> Optional[str]:
+    """Path template of the route that handled the request, e.g. /api/chat/{session_id}"""
+    route = scope.get("route")
+    return getattr(route, "path", None)
+
+class RequestProfile:
+    """Span timings of a single profiled request"""
+
+    def __init__(self):
+        # The root frame is named once routing is done; stacks are keyed below it
+        self.frames = [[None, time.perf_counter(), 0.0]]  # name, start, time spent in children
+        self.self_times = defaultdict(float)  # span names below the root -> seconds
+        self.timings = defaultdict(float)  # span name -> seconds
+
+    def push(self, name: str):
+        self.frames.append([name, time.perf_counter(), 0.0])
+
+    def pop(self):
+        stack = tuple(frame[0] for frame in self.frames[1:])
+        name, started, children = self.frames.pop()
+        elapsed = time.perf_counter() - started
+        self.self_times[stack] += elapsed - children
+        if self.frames:
+            self.timings[name] += elapsed
+            self.frames[-1][2] += elapsed
+
+class ProfileSpan:
+    __slots__ = ("profile", "name")
+
+    def __init__(self, profile: RequestProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.profile.push(self.name)
+
+    def __exit__(self, *exc_info):
+        self.profile.pop()
+        return False
+
+def span(name: str):
+    """Time a phase of the current request when it is being profiled"""
+    profile = _current_profile.get()
+    if profile is None:
+        return _NO_SPAN
+    return ProfileSpan(profile, name)
+
+class Profiler:
+    """Process-wide profiling switch and collapsed-stack aggregate"""
+
+    def __init__(self):
+        self.enabled = os.environ.get('PROFILING_ENABLED', '').lower() in ("1", "true", "yes")
+        self.sample_rate = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+        self.reset()
+
+    def reset(self):
+        self.stacks = Counter()  # collapsed stack -> microseconds
+        self.profiled_requests = 0
+
+    def should_profile(self, headers: list) -> bool:
+        if (b"x-profile", b"1") in headers:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def collect(self, profile: RequestProfile, root: str):
+        while profile.frames:
+            profile.pop()
+        for stack, seconds in profile.self_times.items():
+            self.stacks[";".join((root,) + stack)] += int(seconds * 1_000_000)
+        self.profiled_requests += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {micros}\n" for stack, micros in sorted(self.stacks.items()))
+
+    def status(self) -> ProfilingStatus:
+        return ProfilingStatus(
+            enabled=self.enabled, sample_rate=self.sample_rate,
+            profiled_requests=self.profiled_requests, stacks=len(self.stacks)
+        )
+
+profiler = Profiler()
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled requests or those sent with 'X-Profile: 1'"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.enabled or scope["type"] != "http" or not profiler.should_profile(scope["headers"]):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                server_timing = ", ".join(
+                    f"{name};dur={seconds * 1000:.3f}" for name, seconds in profile.timings.items()
+                )
+                if server_timing:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", server_timing.encode())
+                    ]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            # Route templates keep the number of distinct stacks bounded
+            profiler.collect(profile, f"{scope['method']} {route_path(scope) or '<unmatched>'}")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
 
 # Initialize OpenAI client
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 
-def get_emotional_system_message(mood: str, intensity: int):
-    """Generate system message based on mood and intensity"""
-    
-    emotional_guidance = {
-        "sad": "Tu es un compagnon émotionnel bienveillant et empathique. L'utilisateur se sent triste. Offre du réconfort, de la compréhension et des conseils doux pour l'aider à se sentir mieux. Propose des exercices de respiration, des pensées positives, ou des activités apaisantes.",
-        "anxious": "Tu es un compagnon émotionnel calme et rassurant. L'utilisateur est anxieux. Aide-le à se détendre avec des techniques de respiration, de la pleine conscience, et des paroles apaisantes. Rappelle-lui que l'anxiété est temporaire.",
-        "angry": "Tu es un compagnon émotionnel patient et compréhensif. L'utilisateur est en colère. Aide-le à canaliser cette émotion de manière constructive. Propose des techniques de relaxation et d'expression saine de la colère.",
-        "happy": "Tu es un compagnon émotionnel joyeux et encourageant. L'utilisateur est heureux ! Célèbre avec lui, encourage cette énergie positive, et propose des activités ou défis qui maintiennent cette belle humeur.",
-        "excited": "Tu es un compagnon émotionnel dynamique et motivant. L'utilisateur est excité ! Nourris cette énergie positive, propose des projets stimulants ou des défis créatifs qui canalisent cette excitation.",
-        "calm": "Tu es un compagnon émotionnel paisible et sage. L'utilisateur se sent calme. Renforce ce sentiment de sérénité, propose des moments de méditation ou de réflexion pour approfondir cette paix intérieure.",
-        "tired": "Tu es un compagnon émotionnel doux et réconfortant. L'utilisateur est fatigué. Encourage le repos, propose des techniques de relaxation, et rappelle l'importance de prendre soin de soi.",
-        "confused": "Tu es un compagnon émotionnel patient et éclairant. L'utilisateur se sent confus. Aide-le à clarifier ses pensées, pose des questions bienveillantes pour l'aider à voir plus clair.",
-        "proud": "Tu es un compagnon émotionnel admiratif et encourageant. L'utilisateur se sent fier ! Célèbre ses accomplissements, renforce sa confiance en lui, et encourage cette fierté méritée."
-    }
-    
-    base_message = emotional_guidance.get(mood.lower(), 
-        "Tu es un compagnon émotionnel bienveillant qui s'adapte à tous les états émotionnels avec empathie et sagesse.")
-    
-    intensity_guidance = ""
+# Token accounting
+LLM_MODEL = "gpt-4o"
+TOKENS_PER_MESSAGE = 4  # role and separator overhead of the chat format
+USAGE_FLUSH_INTERVAL = float(os.environ.get('USAGE_FLUSH_INTERVAL', '30'))
+USAGE_DIMENSIONS = {"user": "user_id", "mood": "mood", "endpoint": "endpoint"}
+USAGE_KEY_FIELDS = ("endpoint", "user_id", "mood")  # order of the in-memory rollup keys
+TOKENIZER_LOAD_TIMEOUT = float(os.environ.get('TOKENIZER_LOAD_TIMEOUT', '30'))
+_token_encoding = None
+
+async def load_token_encoding():
+    """Load the tiktoken encoding once at startup; the first load may download it"""
+    global _token_encoding
+    if tiktoken is None:
+        return
+    try:
+        _token_encoding = await asyncio.wait_for(
+            run_in_threadpool(tiktoken.encoding_for_model, LLM_MODEL), TOKENIZER_LOAD_TIMEOUT
+        )
+    except Exception as e:
+        logging.warning(f"tiktoken encoding unavailable, estimating token counts: {str(e)}")
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally with tiktoken, or estimate ~4 characters per token"""
+    if not text:
+        return 0
+    if _token_encoding is not None:
+        return len(_token_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+def count_prompt_tokens(system_message: str, user_text: str) -> int:
+    """Count tokens sent to the LLM for a system + user message pair"""
+    return count_tokens(system_message) + count_tokens(user_text) + 2 * TOKENS_PER_MESSAGE
+
+class UsageTracker:
+    """In-memory rollup of LLM token usage, flushed periodically to the usage collection"""
+
+    def __init__(self):
+        self.pending = defaultdict(self._empty_counters)
+
+    @staticmethod
+    def _empty_counters():
+        return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def record(self, endpoint: str, user_id: str, mood: str, prompt_tokens: int, completion_tokens: int):
+        counters = self.pending[(endpoint, user_id, mood.lower())]
+        counters["calls"] += 1
+        counters["prompt_tokens"] += prompt_tokens
+        counters["completion_tokens"] += completion_tokens
+
+    async def flush(self):
+        """Write pending counters to Mongo as $inc upserts"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, defaultdict(self._empty_counters)
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"endpoint": endpoint, "user_id": user_id, "mood": mood},
+                {"$inc": counters, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for (endpoint, user_id, mood), counters in pending.items()
+        ]
+        try:
+            await db.usage.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Keep the counters so the next flush retries them
+            logging.warning(f"Usage flush failed, will retry: {str(e)}")
+            for key, counters in pending.items():
+                for name, value in counters.items():
+                    self.pending[key][name] += value
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(USAGE_FLUSH_INTERVAL)
+            await self.flush()
+
+    async def summarize(self, dimension: str, key: Optional[str] = None) -> List[UsageSummary]:
+        """Aggregate flushed and pending usage grouped by user, mood or endpoint"""
+        field = USAGE_DIMENSIONS[dimension]
+        # Warm-pool responses nobody was served have no user and only count per mood/endpoint
+        match = {field: key} if key is not None else {field: {"$ne": None}}
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": f"${field}",
+                "calls": {"$sum": "$calls"},
+                "prompt_tokens": {"$sum": "$prompt_tokens"},
+                "completion_tokens": {"$sum": "$completion_tokens"}
+            }}
+        ]
+        totals = defaultdict(self._empty_counters)
+        async for row in db.usage.aggregate(pipeline):
+            for name in ("calls", "prompt_tokens", "completion_tokens"):
+                totals[row["_id"]][name] += row[name]
+
+        position = USAGE_KEY_FIELDS.index(field)
+        for pending_key, counters in self.pending.items():
+            if pending_key[position] is not None and (key is None or pending_key[position] == key):
+                for name, value in counters.items():
+                    totals[pending_key[position]][name] += value
+
+        summaries = [
+            UsageSummary(
+                key=group,
+                total_tokens=counters["prompt_tokens"] + counters["completion_tokens"],
+                **counters
+            )
+            for group, counters in totals.items()
+        ]
+        return sorted(summaries, key=lambda summary: summary.total_tokens, reverse=True)
+
+usage_tracker = UsageTracker()
+
+# Locale catalogs for prompts and fallback responses. They are built once at
+# import time as read-only mappings, and everything derived from them is cached.
+DEFAULT_LOCALE = "fr"
+
+def intensity_bucket(intensity: int) -> str:
     if intensity <= 3:
-        intensity_guidance = " L'émotion est légère, accompagne avec douceur."
+        return "low"
     elif intensity <= 6:
-        intensity_guidance = " L'émotion est modérée, sois présent et attentif."
-    else:
-        intensity_guidance = " L'émotion est intense, sois particulièrement bienveillant et offre un soutien fort."
-    
-    return base_message + intensity_guidance + " Réponds toujours en français avec chaleur et authenticité. Limite tes réponses à 2-3 phrases maximum pour rester accessible."
+        return "moderate"
+    return "high"
 
-def get_fallback_emotional_response(mood: str, intensity: int, message: Optional[str] = None):
-    """Generate intelligent fallback responses when OpenAI is unavailable"""
-    
-    fallback_responses = {
-        "sad": [
-            "Je comprends que tu traverses un moment difficile. Rappelle-toi que ces sentiments sont temporaires et que tu as la force de les surmonter.",
-            "Il est normal de se sentir triste parfois. Prends le temps de respirer profondément et sois bienveillant envers toi-même.",
-            "Ta tristesse est valide. Essaie de faire quelque chose de doux pour toi aujourd'hui, même quelque chose de petit."
-        ],
-        "anxious": [
-            "L'anxiété peut être difficile, mais tu peux la gérer. Essaie de respirer lentement : inspire 4 secondes, retiens 4 secondes, expire 4 secondes.",
-            "Je sens ton inquiétude. Concentre-toi sur le moment présent et rappelle-toi que tu as déjà surmonté des défis auparavant.",
-            "L'anxiété est comme une vague - elle monte mais elle redescend toujours. Tu es plus fort que tu ne le penses."
-        ],
-        "angry": [
-            "Ta colère est compréhensible. Prends quelques respirations profondes et essaie de canaliser cette énergie de manière constructive.",
-            "Il est normal de ressentir de la colère. Essaie de faire de l'exercice ou d'écrire tes pensées pour libérer cette tension.",
-            "Je vois que tu es frustré. Prends un moment pour toi, cette émotion intense va s'apaiser."
-        ],
-        "happy": [
-            "C'est merveilleux de te voir si joyeux ! Profite pleinement de ce moment de bonheur, tu le mérites.",
-            "Ta joie est contagieuse ! Continue à cultiver cette belle énergie positive.",
-            "Quel plaisir de sentir ta bonne humeur ! Partage cette joie avec les personnes qui t'entourent."
-        ],
-        "excited": [
-            "Ton enthousiasme est formidable ! Canalise cette belle énergie dans quelque chose qui te passionne.",
-            "J'adore ton excitation ! Profite de cette motivation pour réaliser tes projets.",
-            "Cette énergie positive est magnifique ! Utilise-la pour créer quelque chose d'extraordinaire."
-        ],
-        "calm": [
-            "Cette sérénité que tu ressens est précieuse. Savoure ce moment de paix intérieure.",
-            "Ton calme est apaisant. Profite de cette tranquillité pour te reconnecter avec toi-même.",
-            "Cette paix que tu ressens est un cadeau. Garde cette sensation avec toi."
-        ],
-        "tired": [
-            "Je sens ta fatigue. Il est important d'écouter ton corps et de te reposer quand tu en as besoin.",
-            "Prends soin de toi. Un peu de repos et de douceur t'aideront à retrouver ton énergie.",
-            "Ta fatigue est un signal de ton corps. Accorde-toi du temps pour récupérer."
-        ],
-        "confused": [
-            "Il est normal de se sentir perdu parfois. Prends le temps de réfléchir, les réponses viendront.",
-            "La confusion fait partie du processus de compréhension. Sois patient avec toi-même.",
-            "Quand tout semble flou, concentre-toi sur une chose à la fois. La clarté reviendra."
-        ],
-        "proud": [
-            "Ta fierté est méritée ! Célèbre tes accomplissements, tu as travaillé dur pour cela.",
-            "C'est formidable de te voir si fier ! Continue sur cette lancée, tu es sur la bonne voie.",
-            "Tes réussites méritent d'être célébrées. Sois fier du chemin parcouru !"
-        ]
+INTENSITY_LEVELS = ("low", "moderate", "high")
+
+def _freeze(catalog: dict) -> MappingProxyType:
+    return MappingProxyType({
+        key: MappingProxyType(value) if isinstance(value, dict) else value
+        for key, value in catalog.items()
+    })
+
+LOCALE_CATALOGS = MappingProxyType({locale: _freeze(catalog) for locale, catalog in {
+    "fr": {
+        "guidance": {
+            "sad": "Tu es un compagnon émotionnel bienveillant et empathique. L'utilisateur se sent triste. Offre du réconfort, de la compréhension et des conseils doux pour l'aider à se sentir mieux. Propose des exercices de respiration, des pensées positives, ou des activités apaisantes.",
+            "anxious": "Tu es un compagnon émotionnel calme et rassurant. L'utilisateur est anxieux. Aide-le à se détendre avec des techniques de respiration, de la pleine conscience, et des paroles apaisantes. Rappelle-lui que l'anxiété est temporaire.",
+            "angry": "Tu es un compagnon émotionnel patient et compréhensif. L'utilisateur est en colère. Aide-le à canaliser cette émotion de manière constructive. Propose des techniques de relaxation et d'expression saine de la colère.",
+            "happy": "Tu es un compagnon émotionnel joyeux et encourageant. L'utilisateur est heureux ! Célèbre avec lui, encourage cette énergie positive, et propose des activités ou défis qui maintiennent cette belle humeur.",
+            "excited": "Tu es un compagnon émotionnel dynamique et motivant. L'utilisateur est excité ! Nourris cette énergie positive, propose des projets stimulants ou des défis créatifs qui canalisent cette excitation.",
+            "calm": "Tu es un compagnon émotionnel paisible et sage. L'utilisateur se sent calme. Renforce ce sentiment de sérénité, propose des moments de méditation ou de réflexion pour approfondir cette paix intérieure.",
+            "tired": "Tu es un compagnon émotionnel doux et réconfortant. L'utilisateur est fatigué. Encourage le repos, propose des techniques de relaxation, et rappelle l'importance de prendre soin de soi.",
+            "confused": "Tu es un compagnon émotionnel patient et éclairant. L'utilisateur se sent confus. Aide-le à clarifier ses pensées, pose des questions bienveillantes pour l'aider à voir plus clair.",
+            "proud": "Tu es un compagnon émotionnel admiratif et encourageant. L'utilisateur se sent fier ! Célèbre ses accomplissements, renforce sa confiance en lui, et encourage cette fierté méritée."
+        },
+        "default_guidance": "Tu es un compagnon émotionnel bienveillant qui s'adapte à tous les états émotionnels avec empathie et sagesse.",
+        "intensity_guidance": {
+            "low": " L'émotion est légère, accompagne avec douceur.",
+            "moderate": " L'émotion est modérée, sois présent et attentif.",
+            "high": " L'émotion est intense, sois particulièrement bienveillant et offre un soutien fort."
+        },
+        "closing": " Réponds toujours en français avec chaleur et authenticité. Limite tes réponses à 2-3 phrases maximum pour rester accessible.",
+        "check_in": "Je me sens {mood} avec une intensité de {intensity}/10. Peux-tu m'aider ?",
+        "check_in_with_message": "Je me sens {mood} (intensité: {intensity}/10). {message}",
+        "fallback": {
+            "sad": (
+                "Je comprends que tu traverses un moment difficile. Rappelle-toi que ces sentiments sont temporaires et que tu as la force de les surmonter.",
+                "Il est normal de se sentir triste parfois. Prends le temps de respirer profondément et sois bienveillant envers toi-même.",
+                "Ta tristesse est valide. Essaie de faire quelque chose de doux pour toi aujourd'hui, même quelque chose de petit."
+            ),
+            "anxious": (
+                "L'anxiété peut être difficile, mais tu peux la gérer. Essaie de respirer lentement : inspire 4 secondes, retiens 4 secondes, expire 4 secondes.",
+                "Je sens ton inquiétude. Concentre-toi sur le moment présent et rappelle-toi que tu as déjà surmonté des défis auparavant.",
+                "L'anxiété est comme une vague - elle monte mais elle redescend toujours. Tu es plus fort que tu ne le penses."
+            ),
+            "angry": (
+                "Ta colère est compréhensible. Prends quelques respirations profondes et essaie de canaliser cette énergie de manière constructive.",
+                "Il est normal de ressentir de la colère. Essaie de faire de l'exercice ou d'écrire tes pensées pour libérer cette tension.",
+                "Je vois que tu es frustré. Prends un moment pour toi, cette émotion intense va s'apaiser."
+            ),
+            "happy": (
+                "C'est merveilleux de te voir si joyeux ! Profite pleinement de ce moment de bonheur, tu le mérites.",
+                "Ta joie est contagieuse ! Continue à cultiver cette belle énergie positive.",
+                "Quel plaisir de sentir ta bonne humeur ! Partage cette joie avec les personnes qui t'entourent."
+            ),
+            "excited": (
+                "Ton enthousiasme est formidable ! Canalise cette belle énergie dans quelque chose qui te passionne.",
+                "J'adore ton excitation ! Profite de cette motivation pour réaliser tes projets.",
+                "Cette énergie positive est magnifique ! Utilise-la pour créer quelque chose d'extraordinaire."
+            ),
+            "calm": (
+                "Cette sérénité que tu ressens est précieuse. Savoure ce moment de paix intérieure.",
+                "Ton calme est apaisant. Profite de cette tranquillité pour te reconnecter avec toi-même.",
+                "Cette paix que tu ressens est un cadeau. Garde cette sensation avec toi."
+            ),
+            "tired": (
+                "Je sens ta fatigue. Il est important d'écouter ton corps et de te reposer quand tu en as besoin.",
+                "Prends soin de toi. Un peu de repos et de douceur t'aideront à retrouver ton énergie.",
+                "Ta fatigue est un signal de ton corps. Accorde-toi du temps pour récupérer."
+            ),
+            "confused": (
+                "Il est normal de se sentir perdu parfois. Prends le temps de réfléchir, les réponses viendront.",
+                "La confusion fait partie du processus de compréhension. Sois patient avec toi-même.",
+                "Quand tout semble flou, concentre-toi sur une chose à la fois. La clarté reviendra."
+            ),
+            "proud": (
+                "Ta fierté est méritée ! Célèbre tes accomplissements, tu as travaillé dur pour cela.",
+                "C'est formidable de te voir si fier ! Continue sur cette lancée, tu es sur la bonne voie.",
+                "Tes réussites méritent d'être célébrées. Sois fier du chemin parcouru !"
+            )
+        },
+        "default_fallback": (
+            "Je suis là pour t'accompagner dans ce que tu ressens. Tes émotions sont importantes et valides.",
+            "Merci de partager tes sentiments avec moi. Tu n'es pas seul dans ce que tu traverses.",
+            "Chaque émotion a sa place et son importance. Je suis là pour t'écouter et te soutenir."
+        ),
+        "message_echo": " Je comprends que tu veuilles partager : '{excerpt}'.",
+        "chat_starters": {
+            "low": "Merci de partager cela avec moi. ",
+            "moderate": "Je t'écoute. ",
+            "high": "C'est important ce que tu me dis. "
+        }
+    },
+    "en": {
+        "guidance": {
+            "sad": "You are a kind and empathetic emotional companion. The user feels sad. Offer comfort, understanding and gentle advice to help them feel better. Suggest breathing exercises, positive thoughts or soothing activities.",
+            "anxious": "You are a calm and reassuring emotional companion. The user is anxious. Help them relax with breathing techniques, mindfulness and soothing words. Remind them that anxiety is temporary.",
+            "angry": "You are a patient and understanding emotional companion. The user is angry. Help them channel this emotion constructively. Suggest relaxation techniques and healthy ways to express anger.",
+            "happy": "You are a joyful and encouraging emotional companion. The user is happy! Celebrate with them, encourage this positive energy, and suggest activities or challenges that keep this good mood going.",
+            "excited": "You are a dynamic and motivating emotional companion. The user is excited! Feed this positive energy, suggest stimulating projects or creative challenges that channel this excitement.",
+            "calm": "You are a peaceful and wise emotional companion. The user feels calm. Strengthen this feeling of serenity, suggest moments of meditation or reflection to deepen this inner peace.",
+            "tired": "You are a gentle and comforting emotional companion. The user is tired. Encourage rest, suggest relaxation techniques, and remind them how important it is to take care of themselves.",
+            "confused": "You are a patient and enlightening emotional companion. The user feels confused. Help them clarify their thoughts, ask kind questions to help them see more clearly.",
+            "proud": "You are an admiring and encouraging emotional companion. The user feels proud! Celebrate their achievements, strengthen their self-confidence, and encourage this well-deserved pride."
+        },
+        "default_guidance": "You are a kind emotional companion who adapts to every emotional state with empathy and wisdom.",
+        "intensity_guidance": {
+            "low": " The emotion is mild, accompany them gently.",
+            "moderate": " The emotion is moderate, be present and attentive.",
+            "high": " The emotion is intense, be especially caring and offer strong support."
+        },
+        "closing": " Always answer in English with warmth and authenticity. Keep your answers to 2-3 sentences at most to stay approachable.",
+        "check_in": "I feel {mood} with an intensity of {intensity}/10. Can you help me?",
+        "check_in_with_message": "I feel {mood} (intensity: {intensity}/10). {message}",
+        "fallback": {
+            "sad": (
+                "I understand you are going through a hard time. Remember that these feelings are temporary and that you have the strength to overcome them.",
+                "It is normal to feel sad sometimes. Take time to breathe deeply and be kind to yourself.",
+                "Your sadness is valid. Try to do something gentle for yourself today, even something small."
+            ),
+            "anxious": (
+                "Anxiety can be hard, but you can manage it. Try breathing slowly: breathe in for 4 seconds, hold for 4 seconds, breathe out for 4 seconds.",
+                "I can feel your worry. Focus on the present moment and remember that you have overcome challenges before.",
+                "Anxiety is like a wave - it rises but it always comes back down. You are stronger than you think."
+            ),
+            "angry": (
+                "Your anger is understandable. Take a few deep breaths and try to channel this energy constructively.",
+                "It is normal to feel angry. Try exercising or writing down your thoughts to release this tension.",
+                "I can see you are frustrated. Take a moment for yourself, this intense emotion will ease."
+            ),
+            "happy": (
+                "It is wonderful to see you so joyful! Fully enjoy this moment of happiness, you deserve it.",
+                "Your joy is contagious! Keep nurturing this beautiful positive energy.",
+                "What a pleasure to feel your good mood! Share this joy with the people around you."
+            ),
+            "excited": (
+                "Your enthusiasm is great! Channel this beautiful energy into something you love.",
+                "I love your excitement! Use this motivation to bring your projects to life.",
+                "This positive energy is magnificent! Use it to create something extraordinary."
+            ),
+            "calm": (
+                "The serenity you feel is precious. Savor this moment of inner peace.",
+                "Your calm is soothing. Use this tranquility to reconnect with yourself.",
+                "The peace you feel is a gift. Keep this feeling with you."
+            ),
+            "tired": (
+                "I can feel your tiredness. It is important to listen to your body and rest when you need to.",
+                "Take care of yourself. A little rest and gentleness will help you get your energy back.",
+                "Your tiredness is a signal from your body. Give yourself time to recover."
+            ),
+            "confused": (
+                "It is normal to feel lost sometimes. Take time to think, the answers will come.",
+                "Confusion is part of the process of understanding. Be patient with yourself.",
+                "When everything seems blurry, focus on one thing at a time. Clarity will return."
+            ),
+            "proud": (
+                "Your pride is well deserved! Celebrate your achievements, you worked hard for them.",
+                "It is great to see you so proud! Keep it up, you are on the right track.",
+                "Your successes deserve to be celebrated. Be proud of how far you have come!"
+            )
+        },
+        "default_fallback": (
+            "I am here to support you in what you feel. Your emotions are important and valid.",
+            "Thank you for sharing your feelings with me. You are not alone in what you are going through.",
+            "Every emotion has its place and its importance. I am here to listen to you and support you."
+        ),
+        "message_echo": " I understand you want to share: '{excerpt}'.",
+        "chat_starters": {
+            "low": "Thank you for sharing this with me. ",
+            "moderate": "I am listening. ",
+            "high": "What you are telling me matters. "
+        }
+    },
+    "es": {
+        "guidance": {
+            "sad": "Eres un compañero emocional amable y empático. El usuario se siente triste. Ofrece consuelo, comprensión y consejos suaves para ayudarle a sentirse mejor. Propón ejercicios de respiración, pensamientos positivos o actividades relajantes.",
+            "anxious": "Eres un compañero emocional tranquilo y tranquilizador. El usuario está ansioso. Ayúdale a relajarse con técnicas de respiración, atención plena y palabras calmantes. Recuérdale que la ansiedad es temporal.",
+            "angry": "Eres un compañero emocional paciente y comprensivo. El usuario está enfadado. Ayúdale a canalizar esta emoción de forma constructiva. Propón técnicas de relajación y formas sanas de expresar el enfado.",
+            "happy": "Eres un compañero emocional alegre y alentador. ¡El usuario está feliz! Celebra con él, fomenta esta energía positiva y propón actividades o retos que mantengan este buen humor.",
+            "excited": "Eres un compañero emocional dinámico y motivador. ¡El usuario está entusiasmado! Alimenta esta energía positiva, propón proyectos estimulantes o retos creativos que canalicen este entusiasmo.",
+            "calm": "Eres un compañero emocional sereno y sabio. El usuario se siente tranquilo. Refuerza esta sensación de serenidad, propón momentos de meditación o reflexión para profundizar esta paz interior.",
+            "tired": "Eres un compañero emocional dulce y reconfortante. El usuario está cansado. Anima al descanso, propón técnicas de relajación y recuerda la importancia de cuidarse.",
+            "confused": "Eres un compañero emocional paciente y esclarecedor. El usuario se siente confundido. Ayúdale a aclarar sus pensamientos, haz preguntas amables para ayudarle a ver con más claridad.",
+            "proud": "Eres un compañero emocional admirador y alentador. ¡El usuario se siente orgulloso! Celebra sus logros, refuerza su confianza en sí mismo y anima este orgullo merecido."
+        },
+        "default_guidance": "Eres un compañero emocional amable que se adapta a todos los estados emocionales con empatía y sabiduría.",
+        "intensity_guidance": {
+            "low": " La emoción es leve, acompaña con suavidad.",
+            "moderate": " La emoción es moderada, mantente presente y atento.",
+            "high": " La emoción es intensa, sé especialmente amable y ofrece un apoyo firme."
+        },
+        "closing": " Responde siempre en español con calidez y autenticidad. Limita tus respuestas a 2-3 frases como máximo para ser accesible.",
+        "check_in": "Me siento {mood} con una intensidad de {intensity}/10. ¿Puedes ayudarme?",
+        "check_in_with_message": "Me siento {mood} (intensidad: {intensity}/10). {message}",
+        "fallback": {
+            "sad": (
+                "Entiendo que estás pasando por un momento difícil. Recuerda que estos sentimientos son temporales y que tienes la fuerza para superarlos.",
+                "Es normal sentirse triste a veces. Tómate el tiempo de respirar profundamente y sé amable contigo mismo.",
+                "Tu tristeza es válida. Intenta hacer algo agradable para ti hoy, aunque sea algo pequeño."
+            ),
+            "anxious": (
+                "La ansiedad puede ser difícil, pero puedes manejarla. Intenta respirar despacio: inhala 4 segundos, retén 4 segundos, exhala 4 segundos.",
+                "Siento tu preocupación. Concéntrate en el momento presente y recuerda que ya has superado retos antes.",
+                "La ansiedad es como una ola: sube, pero siempre vuelve a bajar. Eres más fuerte de lo que crees."
+            ),
+            "angry": (
+                "Tu enfado es comprensible. Respira profundamente unas cuantas veces e intenta canalizar esta energía de forma constructiva.",
+                "Es normal sentir enfado. Intenta hacer ejercicio o escribir tus pensamientos para liberar esta tensión.",
+                "Veo que estás frustrado. Tómate un momento para ti, esta emoción intensa se calmará."
+            ),
+            "happy": (
+                "¡Es maravilloso verte tan alegre! Disfruta plenamente de este momento de felicidad, te lo mereces.",
+                "¡Tu alegría es contagiosa! Sigue cultivando esta bonita energía positiva.",
+                "¡Qué placer sentir tu buen humor! Comparte esta alegría con las personas que te rodean."
+            ),
+            "excited": (
+                "¡Tu entusiasmo es estupendo! Canaliza esta bonita energía en algo que te apasione.",
+                "¡Me encanta tu entusiasmo! Aprovecha esta motivación para llevar a cabo tus proyectos.",
+                "¡Esta energía positiva es magnífica! Úsala para crear algo extraordinario."
+            ),
+            "calm": (
+                "Esta serenidad que sientes es valiosa. Saborea este momento de paz interior.",
+                "Tu calma es reconfortante. Aprovecha esta tranquilidad para reconectar contigo mismo.",
+                "Esta paz que sientes es un regalo. Guarda esta sensación contigo."
+            ),
+            "tired": (
+                "Siento tu cansancio. Es importante escuchar a tu cuerpo y descansar cuando lo necesites.",
+                "Cuídate. Un poco de descanso y de calma te ayudarán a recuperar tu energía.",
+                "Tu cansancio es una señal de tu cuerpo. Date tiempo para recuperarte."
+            ),
+            "confused": (
+                "Es normal sentirse perdido a veces. Tómate tiempo para reflexionar, las respuestas llegarán.",
+                "La confusión forma parte del proceso de comprensión. Sé paciente contigo mismo.",
+                "Cuando todo parece borroso, concéntrate en una cosa a la vez. La claridad volverá."
+            ),
+            "proud": (
+                "¡Tu orgullo es merecido! Celebra tus logros, has trabajado duro para conseguirlos.",
+                "¡Es estupendo verte tan orgulloso! Sigue así, vas por buen camino.",
+                "Tus éxitos merecen ser celebrados. ¡Siéntete orgulloso del camino recorrido!"
+            )
+        },
+        "default_fallback": (
+            "Estoy aquí para acompañarte en lo que sientes. Tus emociones son importantes y válidas.",
+            "Gracias por compartir tus sentimientos conmigo. No estás solo en lo que estás viviendo.",
+            "Cada emoción tiene su lugar y su importancia. Estoy aquí para escucharte y apoyarte."
+        ),
+        "message_echo": " Entiendo que quieras compartir: '{excerpt}'.",
+        "chat_starters": {
+            "low": "Gracias por compartir esto conmigo. ",
+            "moderate": "Te escucho. ",
+            "high": "Lo que me cuentas es importante. "
+        }
+    },
+    "ar": {
+        "guidance": {
+            "sad": "أنت رفيق عاطفي لطيف ومتعاطف. المستخدم يشعر بالحزن. قدّم له المواساة والتفهّم ونصائح لطيفة لمساعدته على الشعور بتحسّن. اقترح تمارين تنفّس أو أفكارًا إيجابية أو أنشطة مهدّئة.",
+            "anxious": "أنت رفيق عاطفي هادئ ومطمئن. المستخدم قلق. ساعده على الاسترخاء بتقنيات التنفّس واليقظة الذهنية والكلمات المهدّئة. ذكّره بأن القلق مؤقت.",
+            "angry": "أنت رفيق عاطفي صبور ومتفهّم. المستخدم غاضب. ساعده على توجيه هذه المشاعر بطريقة بنّاءة. اقترح تقنيات للاسترخاء وطرقًا صحية للتعبير عن الغضب.",
+            "happy": "أنت رفيق عاطفي مبتهج ومشجّع. المستخدم سعيد! احتفل معه، وشجّع هذه الطاقة الإيجابية، واقترح أنشطة أو تحديات تحافظ على هذا المزاج الجميل.",
+            "excited": "أنت رفيق عاطفي نشيط ومحفّز. المستخدم متحمّس! غذِّ هذه الطاقة الإيجابية، واقترح مشاريع محفّزة أو تحديات إبداعية توجّه هذا الحماس.",
+            "calm": "أنت رفيق عاطفي هادئ وحكيم. المستخدم يشعر بالهدوء. عزّز هذا الشعور بالسكينة، واقترح لحظات من التأمل أو التفكير لتعميق هذا السلام الداخلي.",
+            "tired": "أنت رفيق عاطفي لطيف ومريح. المستخدم متعب. شجّعه على الراحة، واقترح تقنيات للاسترخاء، وذكّره بأهمية الاعتناء بنفسه.",
+            "confused": "أنت رفيق عاطفي صبور ومنير. المستخدم يشعر بالحيرة. ساعده على توضيح أفكاره، واطرح أسئلة لطيفة لمساعدته على رؤية الأمور بوضوح أكبر.",
+            "proud": "أنت رفيق عاطفي معجب ومشجّع. المستخدم يشعر بالفخر! احتفل بإنجازاته، وعزّز ثقته بنفسه، وشجّع هذا الفخر المستحق."
+        },
+        "default_guidance": "أنت رفيق عاطفي لطيف يتكيّف مع جميع الحالات العاطفية بتعاطف وحكمة.",
+        "intensity_guidance": {
+            "low": " الشعور خفيف، رافقه بلطف.",
+            "moderate": " الشعور معتدل، كن حاضرًا ومنتبهًا.",
+            "high": " الشعور قوي، كن لطيفًا بشكل خاص وقدّم دعمًا قويًا."
+        },
+        "closing": " أجب دائمًا باللغة العربية بدفء وصدق. اجعل إجاباتك في حدود جملتين أو ثلاث جمل لتبقى سهلة الفهم.",
+        "check_in": "أشعر بـ {mood} بشدة {intensity}/10. هل يمكنك مساعدتي؟",
+        "check_in_with_message": "أشعر بـ {mood} (الشدة: {intensity}/10). {message}",
+        "fallback": {
+            "sad": (
+                "أفهم أنك تمرّ بوقت صعب. تذكّر أن هذه المشاعر مؤقتة وأنك تملك القوة لتجاوزها.",
+                "من الطبيعي أن تشعر بالحزن أحيانًا. خذ وقتك لتتنفس بعمق وكن لطيفًا مع نفسك.",
+                "حزنك مشروع. حاول أن تفعل شيئًا لطيفًا لنفسك اليوم، ولو كان شيئًا صغيرًا."
+            ),
+            "anxious": (
+                "القلق قد يكون صعبًا، لكنك تستطيع التعامل معه. حاول أن تتنفس ببطء: شهيق 4 ثوانٍ، احبس 4 ثوانٍ، زفير 4 ثوانٍ.",
+                "أشعر بقلقك. ركّز على اللحظة الحاضرة وتذكّر أنك تجاوزت تحديات من قبل.",
+                "القلق مثل الموجة - يرتفع لكنه ينخفض دائمًا. أنت أقوى مما تظن."
+            ),
+            "angry": (
+                "غضبك مفهوم. خذ بعض الأنفاس العميقة وحاول توجيه هذه الطاقة بطريقة بنّاءة.",
+                "من الطبيعي أن تشعر بالغضب. جرّب ممارسة الرياضة أو كتابة أفكارك لتحرير هذا التوتر.",
+                "أرى أنك محبط. خذ لحظة لنفسك، هذا الشعور القوي سيهدأ."
+            ),
+            "happy": (
+                "من الرائع أن أراك سعيدًا هكذا! استمتع بهذه اللحظة من السعادة بالكامل، فأنت تستحقها.",
+                "فرحتك معدية! استمر في تنمية هذه الطاقة الإيجابية الجميلة.",
+                "يا لها من متعة أن أشعر بمزاجك الجيد! شارك هذه الفرحة مع من حولك."
+            ),
+            "excited": (
+                "حماسك رائع! وجّه هذه الطاقة الجميلة نحو شيء تحبه.",
+                "أحب حماسك! استفد من هذا الدافع لتحقيق مشاريعك.",
+                "هذه الطاقة الإيجابية رائعة! استخدمها لصنع شيء استثنائي."
+            ),
+            "calm": (
+                "هذه السكينة التي تشعر بها ثمينة. استمتع بهذه اللحظة من السلام الداخلي.",
+                "هدوؤك مريح. استفد من هذه الطمأنينة لتعيد التواصل مع نفسك.",
+                "هذا السلام الذي تشعر به هدية. احتفظ بهذا الإحساس معك."
+            ),
+            "tired": (
+                "أشعر بتعبك. من المهم أن تستمع إلى جسدك وأن ترتاح عندما تحتاج إلى ذلك.",
+                "اعتنِ بنفسك. قليل من الراحة واللطف سيساعدانك على استعادة طاقتك.",
+                "تعبك إشارة من جسدك. امنح نفسك الوقت للتعافي."
+            ),
+            "confused": (
+                "من الطبيعي أن تشعر بالضياع أحيانًا. خذ وقتك للتفكير، وستأتي الإجابات.",
+                "الحيرة جزء من عملية الفهم. كن صبورًا مع نفسك.",
+                "عندما يبدو كل شيء ضبابيًا، ركّز على أمر واحد في كل مرة. سيعود الوضوح."
+            ),
+            "proud": (
+                "فخرك مستحق! احتفل بإنجازاتك، فقد عملت بجد من أجلها.",
+                "من الرائع أن أراك فخورًا هكذا! واصل على هذا النحو، أنت على الطريق الصحيح.",
+                "نجاحاتك تستحق الاحتفال. كن فخورًا بالطريق الذي قطعته!"
+            )
+        },
+        "default_fallback": (
+            "أنا هنا لأرافقك فيما تشعر به. مشاعرك مهمة ومشروعة.",
+            "شكرًا لمشاركتي مشاعرك. لست وحدك فيما تمرّ به.",
+            "لكل شعور مكانه وأهميته. أنا هنا لأستمع إليك وأدعمك."
+        ),
+        "message_echo": " أفهم أنك تريد أن تشارك: '{excerpt}'.",
+        "chat_starters": {
+            "low": "شكرًا لمشاركتك هذا معي. ",
+            "moderate": "أنا أستمع إليك. ",
+            "high": "ما تقوله لي مهم. "
+        }
     }
-    
+}.items()})
+
+SUPPORTED_LOCALES = frozenset(LOCALE_CATALOGS)
+SUPPORTED_MOODS = tuple(LOCALE_CATALOGS[DEFAULT_LOCALE]["guidance"])
+
+@functools.lru_cache(maxsize=512)
+def resolve_locale(accept_language: str) -> Optional[str]:
+    """Pick the best supported locale from a locale tag or an Accept-Language header, if any"""
+    candidates = []
+    for position, part in enumerate(accept_language.split(",")):
+        tag, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        language = tag.strip().lower().replace("_", "-").split("-")[0]
+        if language in SUPPORTED_LOCALES and quality > 0:
+            candidates.append((-quality, position, language))
+    return min(candidates)[2] if candidates else None
+
+def choose_locale(requested: Optional[str], user: Optional[User], accept_language: Optional[str]) -> str:
+    """Explicit request locale first, then the user's saved locale, then Accept-Language"""
+    # Unsupported values fall through to the next source instead of forcing the default
+    for candidate in (requested, user.locale if user is not None else None, accept_language):
+        locale = resolve_locale(candidate) if candidate else None
+        if locale:
+            return locale
+    return DEFAULT_LOCALE
+
+@functools.lru_cache(maxsize=1024)
+def get_emotional_system_message(mood: str, intensity: int, locale: str = DEFAULT_LOCALE):
+    """Generate system message based on mood and intensity"""
+    catalog = LOCALE_CATALOGS.get(locale, LOCALE_CATALOGS[DEFAULT_LOCALE])
+    base_message = catalog["guidance"].get(mood.lower(), catalog["default_guidance"])
+    return base_message + catalog["intensity_guidance"][intensity_bucket(intensity)] + catalog["closing"]
+
+def build_mood_user_text(mood: str, intensity: int, message: Optional[str] = None, locale: str = DEFAULT_LOCALE):
+    """Build the user message sent to the LLM for a mood check-in"""
+    catalog = LOCALE_CATALOGS.get(locale, LOCALE_CATALOGS[DEFAULT_LOCALE])
+    if message:
+        return catalog["check_in_with_message"].format(mood=mood, intensity=intensity, message=message)
+    return catalog["check_in"].format(mood=mood, intensity=intensity)
+
+def get_fallback_emotional_response(mood: str, intensity: int, message: Optional[str] = None, locale: str = DEFAULT_LOCALE):
+    """Generate intelligent fallback responses when OpenAI is unavailable"""
+    catalog = LOCALE_CATALOGS.get(locale, LOCALE_CATALOGS[DEFAULT_LOCALE])
+
     # Get responses for the mood, with fallback to general supportive messages
-    responses = fallback_responses.get(mood.lower(), [
-        "Je suis là pour t'accompagner dans ce que tu ressens. Tes émotions sont importantes et valides.",
-        "Merci de partager tes sentiments avec moi. Tu n'es pas seul dans ce que tu traverses.",
-        "Chaque émotion a sa place et son importance. Je suis là pour t'écouter et te soutenir."
-    ])
-    
-    # Adjust response based on intensity
-    if intensity <= 3:
-        # Light intensity - gentle encouragement
-        base_response = responses[0] if len(responses) > 0 else responses[0]
-    elif intensity <= 6:
-        # Moderate intensity - more supportive
-        base_response = responses[1] if len(responses) > 1 else responses[0]
-    else:
-        # High intensity - strong support
-        base_response = responses[2] if len(responses) > 2 else responses[-1]
-    
+    responses = catalog["fallback"].get(mood.lower(), catalog["default_fallback"])
+
+    # Adjust response based on intensity: gentle, more supportive, strong support
+    base_response = responses[INTENSITY_LEVELS.index(intensity_bucket(intensity))]
+
     # Add personalized touch if user provided a message
     if message:
-        base_response += f" Je comprends que tu veuilles partager : '{message[:50]}{'...' if len(message) > 50 else ''}'."
-    
+        base_response += catalog["message_echo"].format(excerpt=f"{message[:50]}{'...' if len(message) > 50 else ''}")
+
     return base_response
 
-def get_chat_fallback_response(message: str, mood: str, intensity: int):
+def get_chat_fallback_response(message: str, mood: str, intensity: int, locale: str = DEFAULT_LOCALE):
     """Generate intelligent fallback responses for chat when OpenAI is unavailable"""
-    
+    catalog = LOCALE_CATALOGS.get(locale, LOCALE_CATALOGS[DEFAULT_LOCALE])
+
     # Use the existing fallback response function as base
-    base_response = get_fallback_emotional_response(mood, intensity, message)
-    
-    # Add conversational elements for chat context
-    chat_starters = [
-        "Merci de partager cela avec moi. ",
-        "Je t'écoute. ",
-        "C'est important ce que tu me dis. ",
-        "Je comprends. "
-    ]
-    
-    # Select starter based on mood intensity
-    if intensity <= 3:
-        starter = chat_starters[0]
-    elif intensity <= 6:
-        starter = chat_starters[1]
-    else:
-        starter = chat_starters[2]
-    
-    return starter + base_response
+    base_response = get_fallback_emotional_response(mood, intensity, message, locale)
+
+    # Add conversational elements for chat context, selected by mood intensity
+    return catalog["chat_starters"][intensity_bucket(intensity)] + base_response
+
+# Warm pool of pre-generated AI responses per (mood, intensity bucket, locale), so that
+# message-less /ai-response requests don't pay the LLM latency
+WARM_POOL_SIZE = int(os.environ.get('WARM_POOL_SIZE', '3'))
+WARM_POOL_TTL = float(os.environ.get('WARM_POOL_TTL', '1800'))
+WARM_POOL_QUIET_PERIOD = float(os.environ.get('WARM_POOL_QUIET_PERIOD', '5'))
+WARM_POOL_INTERVAL = float(os.environ.get('WARM_POOL_INTERVAL', '10'))
+# Only pools drawn from within this window are refilled, so idle workers make no LLM calls
+WARM_POOL_DEMAND_WINDOW = float(os.environ.get('WARM_POOL_DEMAND_WINDOW', '3600'))
+WARM_POOL_MAX_BACKOFF = float(os.environ.get('WARM_POOL_MAX_BACKOFF', '600'))
+# Only these locales are pre-generated; other locales always call the provider
+WARM_POOL_LOCALES = tuple(
+    locale.strip() for locale in os.environ.get('WARM_POOL_LOCALES', DEFAULT_LOCALE).split(",")
+    if locale.strip() in SUPPORTED_LOCALES
+)
+# Representative intensity for each bucket, matching the thresholds used in the prompts
+INTENSITY_BUCKETS = {"low": 2, "moderate": 5, "high": 8}
+
+class WarmResponsePool:
+    """Keeps a few fresh LLM responses per recently requested (mood, intensity bucket, locale)"""
+
+    def __init__(self):
+        # (mood, bucket, locale) -> deque of (created_at, text, prompt_tokens, completion_tokens)
+        self.pools = defaultdict(deque)
+        self.last_drawn = {}  # (mood, bucket, locale) -> when a request last asked for it
+        self.last_request = 0.0
+        self.failures = 0
+
+    def note_request(self):
+        self.last_request = time.monotonic()
+
+    def is_quiet(self) -> bool:
+        return time.monotonic() - self.last_request >= WARM_POOL_QUIET_PERIOD
+
+    def _discard(self, mood: str, entry: tuple):
+        # Tokens of responses nobody was served are charged to the warm pool itself
+        usage_tracker.record("warm-pool", None, mood, entry[2], entry[3])
+
+    def _drop_stale(self, pool: deque, mood: str):
+        while pool and time.monotonic() - pool[0][0] >= WARM_POOL_TTL:
+            self._discard(mood, pool.popleft())
+
+    def take(self, mood: str, intensity: int, locale: str = DEFAULT_LOCALE) -> Optional[tuple]:
+        """Pop a pooled (text, prompt_tokens, completion_tokens), so the caller can charge its user"""
+        key = (mood.lower(), intensity_bucket(intensity), locale)
+        if key[0] in SUPPORTED_MOODS and locale in WARM_POOL_LOCALES:
+            self.last_drawn[key] = time.monotonic()
+        pool = self.pools.get(key)
+        if not pool:
+            return None
+        self._drop_stale(pool, key[0])
+        return pool.popleft()[1:] if pool else None
+
+    async def generate(self, mood: str, bucket: str, locale: str) -> tuple:
+        intensity = INTENSITY_BUCKETS[bucket]
+        system_message = get_emotional_system_message(mood, intensity, locale)
+        user_text = build_mood_user_text(mood, intensity, locale=locale)
+        # A fresh session per generation keeps the pooled responses varied
+        chat = LlmChat(
+            api_key=OPENAI_API_KEY,
+            session_id=f"warm-{mood}-{bucket}-{locale}-{uuid.uuid4()}",
+            system_message=system_message
+        ).with_model("openai", LLM_MODEL).with_max_tokens(200)
+        text = await chat.send_message(UserMessage(text=user_text))
+        return text, count_prompt_tokens(system_message, user_text), count_tokens(text)
+
+    def warm_up(self):
+        """Mark every mood, bucket and warm locale as wanted so the first requests after a deploy hit the pool"""
+        now = time.monotonic()
+        for mood in SUPPORTED_MOODS:
+            for bucket in INTENSITY_BUCKETS:
+                for locale in WARM_POOL_LOCALES:
+                    self.last_drawn.setdefault((mood, bucket, locale), now)
+
+    async def refill(self) -> bool:
+        """Top up pools with recent demand; returns False if any generation failed"""
+        now = time.monotonic()
+        healthy = True
+        for key, drawn_at in list(self.last_drawn.items()):
+            pool = self.pools[key]
+            if now - drawn_at >= WARM_POOL_DEMAND_WINDOW:
+                # No recent demand: let the pool go instead of regenerating it
+                del self.last_drawn[key]
+                while pool:
+                    self._discard(key[0], pool.popleft())
+                continue
+            self._drop_stale(pool, key[0])
+            # Empty pools are refilled right away, partial ones only when traffic is quiet
+            for _ in range(WARM_POOL_SIZE - len(pool)):
+                if pool and not self.is_quiet():
+                    break
+                try:
+                    entry = (time.monotonic(),) + await self.generate(*key)
+                except Exception as e:
+                    # One failing prompt must not keep the other pools from refilling
+                    logging.warning(f"Warm pool generation failed for {key}: {str(e)}")
+                    healthy = False
+                    break
+                if all(entry[1] != pooled[1] for pooled in pool):
+                    pool.append(entry)
+                else:
+                    self._discard(key[0], entry)
+        return healthy
+
+    def next_delay(self) -> float:
+        """Refill interval, backing off exponentially while the provider keeps failing"""
+        if not self.failures:
+            return WARM_POOL_INTERVAL
+        return min(WARM_POOL_INTERVAL * 2 ** self.failures, WARM_POOL_MAX_BACKOFF)
+
+    async def run(self):
+        while True:
+            try:
+                self.failures = 0 if await self.refill() else self.failures + 1
+            except Exception as e:
+                self.failures += 1
+                logging.warning(f"Warm pool refill failed, retrying in {self.next_delay():.0f}s: {str(e)}")
+            await asyncio.sleep(self.next_delay())
+
+warm_pool = WarmResponsePool()
 
 # API Routes
 #@api_router.post("/users", response_model=User)
@@ -274,21 +1087,50 @@ def get_chat_fallback_response(message: str, mood: str, intensity: int):
 @api_router.post("/create-profile", response_model=User)
 async def create_profile(user_data: UserCreate):
     """Create a new user"""
-    user = User(**user_data.dict())
-    await db.users.insert_one(user.dict())
+    email = normalize_email(user_data.email)
+    if await db.users.find_one({"email": email}, {"_id": 1}):
+        raise HTTPException(status_code=409, detail="Email already registered")
+
+    # Unsupported locales are not saved, so Accept-Language keeps applying
+    locale = resolve_locale(user_data.locale) if user_data.locale else None
+    user = User(email=email, name=user_data.name, locale=locale)
+    user_doc = user.dict()
+    if user_data.password:
+        user_doc["password_hash"] = await run_in_threadpool(pwd_context.hash, user_data.password)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup for the same email
+        raise HTTPException(status_code=409, detail="Email already registered")
+    user_cache.set(user.id, user)
     return user
 @api_router.post("/users", response_model=User)
 async def create_user_alias(user_data: UserCreate):
     # Appeler directement la fonction existante
     return await create_profile(user_data)
 
+@api_router.post("/login", response_model=LoginResponse)
+async def login(credentials: LoginRequest):
+    """Verify credentials and issue a JWT"""
+    user_doc = await db.users.find_one({"email": normalize_email(credentials.email)}, {"_id": 0})
+    password_hash = user_doc.get("password_hash") if user_doc else None
+    verified = await run_in_threadpool(
+        pwd_context.verify, credentials.password, password_hash or DUMMY_PASSWORD_HASH
+    )
+    if not password_hash or not verified:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    user = User(**user_doc)
+    user_cache.set(user.id, user)
+    return LoginResponse(message="Login successful", access_token=create_access_token(user.id), user=user)
+
 @api_router.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str):
     """Get user by ID"""
-    user = await db.users.find_one({"id": user_id})
+    user = await load_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**user)
+    return user
 
 @api_router.post("/mood", response_model=MoodEntry)
 async def log_mood(mood_data: MoodEntryCreate):
@@ -298,56 +1140,79 @@ async def log_mood(mood_data: MoodEntryCreate):
     return mood_entry
 
 @api_router.get("/mood/{user_id}", response_model=List[MoodEntry])
-async def get_user_moods(user_id: str, limit: int = 10):
+async def get_user_moods(user_id: str, request: Request, limit: int = 10):
     """Get user's recent mood entries"""
     moods = await db.mood_entries.find(
-        {"user_id": user_id}
+        {"user_id": user_id}, MOOD_ENTRY_PROJECTION
     ).sort("timestamp", -1).limit(limit).to_list(limit)
-    return [MoodEntry(**mood) for mood in moods]
+    return fast_json_response(request, moods)
 
 @api_router.post("/ai-response", response_model=AIResponse)
-async def get_ai_response(request: AIResponseRequest):
+async def get_ai_response(
+    request: AIResponseRequest,
+    current_user: Optional[User] = Depends(get_current_user),
+    accept_language: Optional[str] = Header(None)
+):
     """Get AI response based on user's mood - with fallback for OpenAI quota issues"""
+    ensure_same_user(current_user, request.user_id)
+    locale = choose_locale(request.locale, current_user, accept_language)
     try:
+        with span("warm_pool"):
+            warm_pool.note_request()
+            # Message-less requests are served from the warm pool when possible
+            pooled_response = None if request.message else warm_pool.take(request.mood, request.intensity, locale)
+            if pooled_response:
+                # Generation tokens are charged to the user actually served the response
+                usage_tracker.record("ai-response", request.user_id, request.mood, *pooled_response[1:])
+        
+        if pooled_response:
+            ai_response_text = pooled_response[0]
         # Try OpenAI integration first
-        if OPENAI_API_KEY:
+        elif OPENAI_API_KEY:
             try:
-                # Create system message based on mood
-                system_message = get_emotional_system_message(request.mood, request.intensity)
+                with span("build_prompt"):
+                    # Create system message based on mood
+                    system_message = get_emotional_system_message(request.mood, request.intensity, locale)
+                    # Prepare user message
+                    user_text = build_mood_user_text(request.mood, request.intensity, request.message, locale)
                 
                 # Initialize LLM chat
                 chat = LlmChat(
                     api_key=OPENAI_API_KEY,
                     session_id=f"mood-{request.user_id}-{datetime.utcnow().timestamp()}",
                     system_message=system_message
-                ).with_model("openai", "gpt-4o").with_max_tokens(200)
+                ).with_model("openai", LLM_MODEL).with_max_tokens(200)
                 
-                # Prepare user message
-                if request.message:
-                    user_text = f"Je me sens {request.mood} (intensité: {request.intensity}/10). {request.message}"
-                else:
-                    user_text = f"Je me sens {request.mood} avec une intensité de {request.intensity}/10. Peux-tu m'aider ?"
-                
-                user_message = UserMessage(text=user_text)
-                ai_response_text = await chat.send_message(user_message)
+                with span("llm_call"):
+                    ai_response_text = await chat.send_message(UserMessage(text=user_text))
+                with span("token_accounting"):
+                    usage_tracker.record(
+                        "ai-response", request.user_id, request.mood,
+                        count_prompt_tokens(system_message, user_text),
+                        count_tokens(ai_response_text)
+                    )
                 
             except Exception as openai_error:
                 # Fallback to intelligent mock responses if OpenAI fails
                 logging.warning(f"OpenAI error, using fallback: {str(openai_error)}")
-                ai_response_text = get_fallback_emotional_response(request.mood, request.intensity, request.message)
+                with span("fallback"):
+                    ai_response_text = get_fallback_emotional_response(request.mood, request.intensity, request.message, locale)
         else:
             # Use fallback if no API key
-            ai_response_text = get_fallback_emotional_response(request.mood, request.intensity, request.message)
+            with span("fallback"):
+                ai_response_text = get_fallback_emotional_response(request.mood, request.intensity, request.message, locale)
         
         # Save to database
-        ai_response = AIResponse(
-            user_id=request.user_id,
-            mood=request.mood,
-            intensity=request.intensity,
-            ai_response=ai_response_text
-        )
+        with span("validation"):
+            ai_response = AIResponse(
+                user_id=request.user_id,
+                mood=request.mood,
+                intensity=request.intensity,
+                ai_response=ai_response_text
+            )
         
-        await db.ai_responses.insert_one(ai_response.dict())
+        with span("insert_one"):
+            await db.ai_responses.insert_one(ai_response.dict())
         
         return ai_response
         
@@ -356,42 +1221,60 @@ async def get_ai_response(request: AIResponseRequest):
         raise HTTPException(status_code=500, detail="Error generating AI response")
 
 @api_router.post("/chat", response_model=ChatMessage)
-async def chat_with_ai(request: ChatRequest):
+async def chat_with_ai(
+    request: ChatRequest,
+    current_user: Optional[User] = Depends(get_current_user),
+    accept_language: Optional[str] = Header(None)
+):
     """Continue conversation with AI companion - with fallback for OpenAI quota issues"""
+    ensure_same_user(current_user, request.user_id)
+    locale = choose_locale(request.locale, current_user, accept_language)
+    warm_pool.note_request()
     try:
         # Try OpenAI integration first
         if OPENAI_API_KEY:
             try:
-                system_message = get_emotional_system_message(request.current_mood, request.mood_intensity)
+                with span("build_prompt"):
+                    system_message = get_emotional_system_message(request.current_mood, request.mood_intensity, locale)
                 
                 # Initialize chat with session ID for conversation continuity
                 chat = LlmChat(
                     api_key=OPENAI_API_KEY,
                     session_id=request.session_id,
                     system_message=system_message
-                ).with_model("openai", "gpt-4o").with_max_tokens(250)
+                ).with_model("openai", LLM_MODEL).with_max_tokens(250)
                 
-                user_message = UserMessage(text=request.message)
-                ai_response_text = await chat.send_message(user_message)
+                with span("llm_call"):
+                    ai_response_text = await chat.send_message(UserMessage(text=request.message))
+                with span("token_accounting"):
+                    usage_tracker.record(
+                        "chat", request.user_id, request.current_mood,
+                        count_prompt_tokens(system_message, request.message),
+                        count_tokens(ai_response_text)
+                    )
                 
             except Exception as openai_error:
                 # Fallback to intelligent mock responses if OpenAI fails
                 logging.warning(f"OpenAI error in chat, using fallback: {str(openai_error)}")
-                ai_response_text = get_chat_fallback_response(request.message, request.current_mood, request.mood_intensity)
+                with span("fallback"):
+                    ai_response_text = get_chat_fallback_response(request.message, request.current_mood, request.mood_intensity, locale)
         else:
             # Use fallback if no API key
-            ai_response_text = get_chat_fallback_response(request.message, request.current_mood, request.mood_intensity)
+            with span("fallback"):
+                ai_response_text = get_chat_fallback_response(request.message, request.current_mood, request.mood_intensity, locale)
         
         # Save chat message
-        chat_message = ChatMessage(
-            user_id=request.user_id,
-            session_id=request.session_id,
-            user_message=request.message,
-            ai_response=ai_response_text,
-            mood_context=f"{request.current_mood}-{request.mood_intensity}"
-        )
+        with span("validation"):
+            chat_message = ChatMessage(
+                user_id=request.user_id,
+                session_id=request.session_id,
+                user_message=request.message,
+                ai_response=ai_response_text,
+                mood_context=f"{request.current_mood}-{request.mood_intensity}"
+            )
         
-        await db.chat_messages.insert_one(chat_message.dict())
+        with span("insert_one"):
+            await db.chat_messages.insert_one(chat_message.dict())
         
         return chat_message
         
@@ -400,12 +1283,204 @@ async def chat_with_ai(request: ChatRequest):
         raise HTTPException(status_code=500, detail="Error in chat")
 
 @api_router.get("/chat/{session_id}", response_model=List[ChatMessage])
-async def get_chat_history(session_id: str, limit: int = 20):
+async def get_chat_history(session_id: str, request: Request, limit: int = 20):
     """Get chat history for a session"""
     messages = await db.chat_messages.find(
-        {"session_id": session_id}
+        {"session_id": session_id}, CHAT_MESSAGE_PROJECTION
     ).sort("timestamp", 1).limit(limit).to_list(limit)
-    return [ChatMessage(**msg) for msg in messages]
+    return fast_json_response(request, messages)
+
+@api_router.get("/usage/{dimension}", response_model=List[UsageSummary], dependencies=[Depends(require_admin)])
+async def get_usage(dimension: str, key: Optional[str] = None):
+    """Get LLM token usage grouped by user, mood or endpoint"""
+    if dimension not in USAGE_DIMENSIONS:
+        raise HTTPException(status_code=404, detail="Unknown usage dimension")
+    if dimension == "mood" and key is not None:
+        # Moods are recorded lowercased
+        key = key.lower()
+    return await usage_tracker.summarize(dimension, key)
+
+@api_router.get("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+async def get_profiling_status():
+    """Get the profiling switch and how much has been captured"""
+    return profiler.status()
+
+@api_router.post("/admin/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+async def update_profiling(settings: ProfilingSettings):
+    """Turn sampled profiling on or off"""
+    profiler.enabled = settings.enabled
+    profiler.sample_rate = settings.sample_rate
+    return profiler.status()
+
+@api_router.get("/admin/profiling/collapsed", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def get_collapsed_stacks(reset: bool = False):
+    """Dump collapsed stacks (microseconds) for flamegraph.pl or speedscope"""
+    collapsed = profiler.collapsed()
+    if reset:
+        profiler.reset()
+    return collapsed
+
+# Live change feed for mood dashboards: one upstream subscription (change
+# streams, or polling when Mongo is not a replica set) fanned out to SSE viewers
+FEED_COLLECTIONS = {"mood_entries": MOOD_ENTRY_PROJECTION, "ai_responses": AI_RESPONSE_PROJECTION}
+FEED_COALESCE_WINDOW = float(os.environ.get('FEED_COALESCE_WINDOW', '0.25'))
+FEED_POLL_INTERVAL = float(os.environ.get('FEED_POLL_INTERVAL', '2'))
+FEED_HEARTBEAT_INTERVAL = 15
+FEED_QUEUE_SIZE = 100
+FEED_RETRY_INTERVAL = 1.0
+FEED_MAX_RETRY_INTERVAL = 60.0
+
+def project_document(document: dict, projection: dict) -> dict:
+    return {field: document[field] for field, keep in projection.items() if keep and field in document}
+
+def format_sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+class ChangeFeedBroadcaster:
+    """Fans one upstream insert feed out to many viewers, coalescing bursts into deltas"""
+
+    def __init__(self):
+        self.subscribers = {}  # queue -> user_id
+        self.pending = []
+        self.flush_handle = None
+        self.task = None
+        self.watching = False
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=FEED_QUEUE_SIZE)
+        self.subscribers[queue] = user_id
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.pop(queue, None)
+        # The upstream subscription only lives while someone is watching
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def publish(self, collection: str, document: dict):
+        self.pending.append((collection, document))
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(FEED_COALESCE_WINDOW, self.flush)
+
+    def flush(self):
+        """Send each viewer one delta event with the documents that concern it"""
+        self.flush_handle = None
+        pending, self.pending = self.pending, []
+        encoded = {}  # user_id -> event, so viewers of the same user share one encoding
+        for queue, user_id in list(self.subscribers.items()):
+            if user_id not in encoded:
+                delta = defaultdict(list)
+                for collection, document in pending:
+                    if document.get("user_id") == user_id:
+                        delta[collection].append(document)
+                encoded[user_id] = format_sse("delta", delta) if delta else None
+            if encoded[user_id] is None:
+                continue
+            try:
+                queue.put_nowait(encoded[user_id])
+            except asyncio.QueueFull:
+                # Slow viewer: drop its backlog and ask it to refetch the full history
+                self.resync(queue)
+
+    def resync(self, queue: asyncio.Queue):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(format_sse("resync", {}))
+
+    async def watch(self):
+        pipeline = [{"$match": {"operationType": "insert", "ns.coll": {"$in": list(FEED_COLLECTIONS)}}}]
+        async with db.watch(pipeline) as stream:
+            self.watching = True
+            async for change in stream:
+                collection = change["ns"]["coll"]
+                self.publish(collection, project_document(change["fullDocument"], FEED_COLLECTIONS[collection]))
+
+    async def poll(self):
+        # Mongo stores milliseconds, so several inserts can share the newest timestamp:
+        # query with $gte and skip the ids already published at that timestamp
+        started = datetime.utcnow()
+        since = {collection: started.replace(microsecond=started.microsecond // 1000 * 1000)
+                 for collection in FEED_COLLECTIONS}
+        seen = {collection: set() for collection in FEED_COLLECTIONS}
+        while True:
+            await asyncio.sleep(FEED_POLL_INTERVAL)
+            for collection, projection in FEED_COLLECTIONS.items():
+                cursor = db[collection].find(
+                    {"timestamp": {"$gte": since[collection]}}, projection
+                ).sort("timestamp", 1)
+                async for document in cursor:
+                    if document["id"] in seen[collection]:
+                        continue
+                    if document["timestamp"] > since[collection]:
+                        since[collection] = document["timestamp"]
+                        seen[collection] = set()
+                    seen[collection].add(document["id"])
+                    self.publish(collection, document)
+
+    async def follow(self):
+        self.watching = False
+        try:
+            await self.watch()
+        except Exception as e:
+            if self.watching:
+                raise
+            # Change streams need a replica set, and mock clients have none at all
+            logging.info(f"Change streams unavailable, polling instead: {str(e)}")
+            await self.poll()
+
+    async def run(self):
+        """Keep the upstream subscription alive, backing off while Mongo is failing"""
+        failures = 0
+        while True:
+            started = time.monotonic()
+            try:
+                await self.follow()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if time.monotonic() - started > FEED_MAX_RETRY_INTERVAL:
+                    failures = 0
+                delay = min(FEED_RETRY_INTERVAL * 2 ** failures, FEED_MAX_RETRY_INTERVAL)
+                failures += 1
+                logging.warning(f"Change feed failed, retrying in {delay:.0f}s: {str(e)}")
+                # Inserts may have been missed while the feed was down
+                for queue in list(self.subscribers):
+                    self.resync(queue)
+                await asyncio.sleep(delay)
+
+feed_broadcaster = ChangeFeedBroadcaster()
+
+@api_router.get("/mood/{user_id}/stream")
+async def stream_user_activity(
+    user_id: str,
+    request: Request,
+    current_user: Optional[User] = Depends(get_current_user)
+):
+    """Server-sent events with new mood entries and AI responses for a user"""
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    ensure_same_user(current_user, user_id)
+
+    async def event_stream():
+        queue = feed_broadcaster.subscribe(user_id)
+        try:
+            yield b"retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=FEED_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            feed_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Health check
 @api_router.get("/")
@@ -415,6 +1490,12 @@ async def root():
 # Include the router in the main app
 app.include_router(api_router)
 
+# Legacy un-prefixed routes, kept for existing clients
+app.post("/profile", response_model=User)(create_profile)
+app.post("/login", response_model=LoginResponse)(login)
+
+app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -423,6 +1504,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Traffic recorder: captures sanitized /api requests and their timing as JSONL
+# so they can be replayed against another build with replay_traffic.py
+TRAFFIC_RECORD_PATH = os.environ.get('TRAFFIC_RECORD_PATH')
+REDACTED_FIELDS = {"email", "name", "password", "message", "user_message"}
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+
+def pseudonymize_ids(text: str) -> str:
+    """Replace UUIDs with stable pseudonyms so per-user locality survives sanitizing"""
+    return UUID_PATTERN.sub(lambda match: str(uuid.UUID(bytes=hashlib.blake2b(
+        match.group(0).lower().encode(), digest_size=16).digest())), text)
+
+def sanitize_payload(payload):
+    """Redact free text and personal data, keeping only its length"""
+    if isinstance(payload, dict):
+        return {
+            key: f"<redacted:{len(value)}>" if key in REDACTED_FIELDS and isinstance(value, str)
+            else sanitize_payload(value)
+            for key, value in payload.items()
+        }
+    if isinstance(payload, list):
+        return [sanitize_payload(item) for item in payload]
+    if isinstance(payload, str):
+        return pseudonymize_ids(payload)
+    return payload
+
+async def record_traffic(request: Request, call_next):
+    if not request.url.path.startswith("/api"):
+        return await call_next(request)
+
+    raw_body = await request.body()
+    started = time.perf_counter()
+    response = await call_next(request)
+    duration_ms = (time.perf_counter() - started) * 1000
+    # Live feeds stay open until the viewer leaves, so they can't be replayed as timed requests
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        return response
+
+    try:
+        body = sanitize_payload(json.loads(raw_body)) if raw_body else None
+    except ValueError:
+        body = None
+    record = {
+        "ts": time.time(),
+        "method": request.method,
+        "path": pseudonymize_ids(request.url.path),
+        "route": route_path(request.scope),
+        "query": pseudonymize_ids(request.url.query),
+        "body": body,
+        "status": response.status_code,
+        "duration_ms": round(duration_ms, 3),
+        "response_bytes": int(response.headers.get("content-length", 0))
+    }
+    app.state.traffic_log.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return response
+
+if TRAFFIC_RECORD_PATH:
+    app.state.traffic_log = open(TRAFFIC_RECORD_PATH, "a", buffering=1, encoding="utf-8")
+    app.middleware("http")(record_traffic)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -430,6 +1570,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_user_indexes():
+    try:
+        await db.users.create_index("email", unique=True)
+    except Exception as e:
+        # Existing duplicate emails must be cleaned up before the index can be built
+        logging.warning(f"Could not create unique email index: {str(e)}")
+
+@app.on_event("startup")
+async def load_tokenizer():
+    await load_token_encoding()
+
+@app.on_event("startup")
+async def start_usage_flusher():
+    app.state.usage_flusher = asyncio.create_task(usage_tracker.run())
+
+@app.on_event("startup")
+async def start_warm_pool():
+    enabled = OPENAI_API_KEY and WARM_POOL_LOCALES
+    if enabled:
+        warm_pool.warm_up()
+    app.state.warm_pool_refiller = asyncio.create_task(warm_pool.run()) if enabled else None
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.usage_flusher.cancel()
+    if app.state.warm_pool_refiller:
+        app.state.warm_pool_refiller.cancel()
+    if feed_broadcaster.task is not None:
+        feed_broadcaster.task.cancel()
+    await usage_tracker.flush()
+    if TRAFFIC_RECORD_PATH:
+        app.state.traffic_log.close()
     client.close()
\ No newline at end of file
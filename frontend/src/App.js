@@ -4,6 +4,16 @@ import axios from "axios";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Profiles are unique per email, so the created profile is kept for the next visits
+const STORED_USER_KEY = "emotionalCompanionUser";
+
+const loadStoredUser = () => {
+  try {
+    return JSON.parse(localStorage.getItem(STORED_USER_KEY));
+  } catch (error) {
+    return null;
+  }
+};
 
 // Mood colors and emojis
 const MOODS = {
@@ -82,8 +92,8 @@ function App() {
   const [sessionId, setSessionId] = useState(null);
   const [loading, setLoading] = useState(false);
   const [showChat, setShowChat] = useState(false);
-  const [userName, setUserName] = useState("");
-  const [userEmail, setUserEmail] = useState("");
+  const [userName, setUserName] = useState(() => loadStoredUser()?.name || "");
+  const [userEmail, setUserEmail] = useState(() => loadStoredUser()?.email || "");
   const [step, setStep] = useState("welcome"); // welcome, mood-selection, ai-response, chat
 
   // Initialize user and session
@@ -100,16 +110,28 @@ function App() {
       return;
     }
     
+    const storedUser = loadStoredUser();
+    if (storedUser && storedUser.email === userEmail.trim().toLowerCase()) {
+      setCurrentUser(storedUser);
+      setStep("mood-selection");
+      return;
+    }
+
     try {
       const response = await axios.post(`${API}/users`, {
         name: userName,
         email: userEmail
       });
+      localStorage.setItem(STORED_USER_KEY, JSON.stringify(response.data));
       setCurrentUser(response.data);
       setStep("mood-selection");
     } catch (error) {
       console.error("Error creating user:", error);
-      alert("Erreur lors de la création du profil");
+      if (error.response?.status === 409) {
+        alert("Un profil existe déjà avec cet email. Utilisez l'appareil sur lequel vous l'avez créé ou un autre email.");
+      } else {
+        alert("Erreur lors de la création du profil");
+      }
     }
   };
 
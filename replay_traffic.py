@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Traffic replay benchmark for EmotionalCompanion
+Replays traffic recorded with TRAFFIC_RECORD_PATH against a local server.app
+and compares latency and throughput between two builds
+
+Usage:
+    python replay_traffic.py replay traffic.jsonl --output baseline.json
+    python replay_traffic.py replay traffic.jsonl --output candidate.json --speed 4
+    python replay_traffic.py compare baseline.json candidate.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+# The replay database is dropped before every run, so it must never be a real one
+REPLAY_DB_PREFIX = "replay_"
+REPLAY_DB_NAME = "replay_benchmark"
+DEFAULT_MONGO_URL = "mongodb://localhost:27017"
+REDACTED_PATTERN = re.compile(r"^<redacted:(\d+)>$")
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+FILLER_TEXT = "Je me sens comme ça aujourd'hui et j'aimerais en parler un peu. "
+# Server-sent event streams never end, so they cannot be timed like other requests
+STREAMING_PATH_PATTERN = re.compile(r"^/api/mood/[^/]+/stream$")
+
+
+class StubLlmChat:
+    """Drop-in for LlmChat that answers after a fixed latency"""
+
+    latency = 0.5
+
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        self.session_id = session_id
+        self.system_message = system_message
+        self.max_tokens = 200
+
+    def with_model(self, provider, model):
+        return self
+
+    def with_max_tokens(self, max_tokens):
+        self.max_tokens = max_tokens
+        return self
+
+    async def send_message(self, user_message):
+        await asyncio.sleep(self.latency)
+        return "Je suis là pour toi. Prends le temps de respirer profondément. Tu n'es pas seul."
+
+
+class StubUserMessage:
+    """Matches the UserMessage(text=...) call made by server.py"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def load_server(mongo_url):
+    """Import server.py against the replay database, a stub LLM and no warm pool"""
+    os.environ["MONGO_URL"] = mongo_url
+    os.environ["DB_NAME"] = REPLAY_DB_NAME
+    os.environ["OPENAI_API_KEY"] = "replay-stub"
+    os.environ.pop("TRAFFIC_RECORD_PATH", None)
+    # The warm pool would make pool hits depend on background timing between runs
+    os.environ["WARM_POOL_LOCALES"] = ""
+    os.environ.setdefault("JWT_SECRET", "replay-benchmark")
+    sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+    import server
+    server.LlmChat = StubLlmChat
+    server.UserMessage = StubUserMessage
+    return server
+
+
+async def reset_database(server):
+    name = server.db.name
+    if not name.startswith(REPLAY_DB_PREFIX):
+        raise RuntimeError(f"Refusing to drop database {name!r}: replay databases must start with {REPLAY_DB_PREFIX!r}")
+    await server.client.drop_database(name)
+
+
+def is_streaming(record):
+    return STREAMING_PATH_PATTERN.match(record["path"]) is not None
+
+
+def restore_payload(payload, key=None):
+    """Replace redacted fields with synthetic values of the same length"""
+    if isinstance(payload, dict):
+        return {k: restore_payload(v, k) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [restore_payload(item) for item in payload]
+    if isinstance(payload, str):
+        match = REDACTED_PATTERN.match(payload)
+        if match:
+            if key == "email":
+                return f"replay-{uuid.uuid4().hex}@example.com"
+            length = int(match.group(1))
+            return (FILLER_TEXT * (length // len(FILLER_TEXT) + 1))[:length]
+    return payload
+
+
+def route_template(record):
+    """Group by the recorded route template; older recordings only have the path"""
+    if "route" in record:
+        return record["route"] or "<unmatched>"
+    return UUID_PATTERN.sub("{id}", record["path"])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def load_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def replay(server, records, speed, concurrency):
+    """Re-issue recorded requests; speed 0 sends them back to back"""
+    transport = httpx.ASGITransport(app=server.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    first_ts = records[0]["ts"]
+
+    async def issue(client, record, start):
+        if speed > 0:
+            delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        route = f"{record['method']} {route_template(record)}"
+        url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        body = restore_payload(record.get("body"))
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(record["method"], url, json=body)
+                if response.status_code >= 500:
+                    errors[route] += 1
+            except Exception:
+                errors[route] += 1
+            latencies[route].append((time.perf_counter() - started) * 1000)
+
+    # Each run starts from an empty database so builds are compared on equal terms
+    await reset_database(server)
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(issue(client, record, start) for record in records))
+            elapsed = time.perf_counter() - start
+    finally:
+        await server.app.router.shutdown()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "summary": {
+            "requests": len(all_latencies),
+            "errors": sum(errors.values()),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(all_latencies) / elapsed, 3) if elapsed else 0.0,
+            **summarize(all_latencies),
+        },
+        "routes": {
+            route: {**summarize(values), "errors": errors[route]}
+            for route, values in sorted(latencies.items())
+        },
+        "settings": {"speed": speed, "concurrency": concurrency, "llm_latency_s": StubLlmChat.latency},
+        "replay_timestamp": datetime.now().isoformat(),
+    }
+
+
+def percent_change(before, after):
+    if not before:
+        return None
+    return round((after - before) / before * 100, 2)
+
+
+def compare(baseline, candidate, threshold):
+    """Print per-route latency diffs and return the routes that regressed"""
+    regressions = []
+    rows = [("ALL", baseline["summary"], candidate["summary"])]
+    rows += [
+        (route, baseline["routes"][route], candidate["routes"][route])
+        for route in sorted(set(baseline["routes"]) & set(candidate["routes"]))
+    ]
+
+    print(f"{'route':<40} {'p50 Δ%':>9} {'p95 Δ%':>9} {'p99 Δ%':>9}")
+    for route, before, after in rows:
+        changes = [percent_change(before[key], after[key]) for key in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"{route:<40} " + " ".join(f"{'n/a' if c is None else c:>9}" for c in changes))
+        if changes[1] is not None and changes[1] > threshold:
+            regressions.append(route)
+
+    throughput = percent_change(baseline["summary"]["throughput_rps"], candidate["summary"]["throughput_rps"])
+    print(f"\n📈 Throughput: {baseline['summary']['throughput_rps']} → "
+          f"{candidate['summary']['throughput_rps']} req/s ({throughput}%)")
+    if throughput is not None and throughput < -threshold:
+        regressions.append("throughput")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="Replay recorded traffic against server.app")
+    replay_parser.add_argument("traffic", help="JSONL file written by the traffic recorder")
+    replay_parser.add_argument("--output", required=True, help="Where to save the results JSON")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="Time acceleration factor (1 = original pacing, 0 = back to back)")
+    replay_parser.add_argument("--concurrency", type=int, default=50, help="Maximum requests in flight")
+    replay_parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub LLM latency in seconds")
+    replay_parser.add_argument("--mongo-url", default=DEFAULT_MONGO_URL,
+                               help=f"Mongo to replay against; the {REPLAY_DB_NAME} database is dropped first")
+
+    compare_parser = commands.add_parser("compare", help="Diff two replay results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Allowed p95 / throughput regression in percent")
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        records = load_records(args.traffic)
+        streaming = [record for record in records if is_streaming(record)]
+        records = [record for record in records if not is_streaming(record)]
+        if streaming:
+            print(f"⏭️  Skipping {len(streaming)} server-sent event requests")
+        if not records:
+            print("⚠️  No recorded requests found")
+            return False
+        StubLlmChat.latency = args.llm_latency
+        server = load_server(args.mongo_url)
+        results = asyncio.run(replay(server, records, args.speed, args.concurrency))
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        summary = results["summary"]
+        print(f"📊 {summary['requests']} requests, {summary['errors']} errors, "
+              f"{summary['throughput_rps']} req/s, p95 {summary['p95_ms']} ms")
+        print(f"📄 Results saved to {args.output}")
+        return summary["errors"] == 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"⚠️  Regressions above {args.threshold}%: {', '.join(regressions)}")
+    else:
+        print("🎉 No performance regressions")
+    return not regressions
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,25 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The tests run the FastAPI app in-process against an in-memory Mongo
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ["OPENAI_API_KEY"] = ""
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import server  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "db", AsyncMongoMockClient()["test_database"])
+    monkeypatch.setattr(server, "user_cache", server.TTLCache(server.USER_CACHE_TTL))
+    with TestClient(server.app) as test_client:
+        yield test_client
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+from tests.test_users import create_user, login
+
+
+def parse_event(payload: bytes):
+    event, data = payload.decode().strip().split("\n")
+    return event.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))
+
+
+def run_feed(monkeypatch, scenario, follow=None):
+    """Run a scenario against a broadcaster whose upstream is replaced by `follow`"""
+    async def idle():
+        await asyncio.Event().wait()
+
+    broadcaster = server.ChangeFeedBroadcaster()
+    monkeypatch.setattr(broadcaster, "follow", follow or idle)
+    monkeypatch.setattr(server, "FEED_COALESCE_WINDOW", 0.01)
+
+    async def main():
+        try:
+            return await scenario(broadcaster)
+        finally:
+            if broadcaster.task is not None:
+                broadcaster.task.cancel()
+
+    return asyncio.run(main())
+
+
+def test_burst_is_coalesced_into_one_delta_per_viewer(monkeypatch):
+    async def scenario(broadcaster):
+        alice_1 = broadcaster.subscribe("alice")
+        alice_2 = broadcaster.subscribe("alice")
+        bob = broadcaster.subscribe("bob")
+        for intensity in (1, 2, 3):
+            broadcaster.publish("mood_entries", {"user_id": "alice", "mood": "calm", "intensity": intensity})
+        broadcaster.publish("ai_responses", {"user_id": "alice", "ai_response": "Bonjour"})
+        await asyncio.sleep(0.05)
+        return alice_1, alice_2, bob
+
+    alice_1, alice_2, bob = run_feed(monkeypatch, scenario)
+
+    assert alice_1.qsize() == 1
+    assert bob.empty()
+    event, delta = parse_event(alice_1.get_nowait())
+    assert event == "delta"
+    assert [entry["intensity"] for entry in delta["mood_entries"]] == [1, 2, 3]
+    assert delta["ai_responses"] == [{"user_id": "alice", "ai_response": "Bonjour"}]
+    assert parse_event(alice_2.get_nowait()) == (event, delta)
+
+
+def test_slow_viewer_gets_resync_instead_of_backlog(monkeypatch):
+    monkeypatch.setattr(server, "FEED_QUEUE_SIZE", 2)
+
+    async def scenario(broadcaster):
+        queue = broadcaster.subscribe("alice")
+        for intensity in range(5):
+            broadcaster.publish("mood_entries", {"user_id": "alice", "intensity": intensity})
+            broadcaster.flush()
+        return queue
+
+    queue = run_feed(monkeypatch, scenario)
+
+    events = [parse_event(queue.get_nowait())[0] for _ in range(queue.qsize())]
+    assert "resync" in events
+    assert len(events) <= 2
+
+
+def test_upstream_failure_resyncs_viewers_and_retries(monkeypatch):
+    monkeypatch.setattr(server, "FEED_RETRY_INTERVAL", 0.01)
+    attempts = []
+
+    async def failing_follow():
+        attempts.append(1)
+        raise RuntimeError("mongo down")
+
+    async def scenario(broadcaster):
+        queue = broadcaster.subscribe("alice")
+        await asyncio.sleep(0.1)
+        assert not broadcaster.task.done()
+        return queue
+
+    queue = run_feed(monkeypatch, scenario, follow=failing_follow)
+
+    assert len(attempts) >= 2
+    assert parse_event(queue.get_nowait())[0] == "resync"
+
+
+def test_poll_publishes_inserts_sharing_a_timestamp_once(monkeypatch):
+    monkeypatch.setattr(server, "db", AsyncMongoMockClient()["feed_database"])
+    monkeypatch.setattr(server, "FEED_POLL_INTERVAL", 0.01)
+    published = []
+
+    async def scenario(broadcaster):
+        monkeypatch.setattr(broadcaster, "publish", lambda collection, document: published.append(document["id"]))
+        poller = asyncio.create_task(broadcaster.poll())
+        await asyncio.sleep(0.005)
+        timestamp = datetime.utcnow().replace(microsecond=0) + timedelta(seconds=1)
+        entry = {"user_id": "alice", "mood": "calm", "intensity": 3, "timestamp": timestamp}
+        await server.db.mood_entries.insert_one({**entry, "id": "first"})
+        await asyncio.sleep(0.05)
+        # Same millisecond as the newest entry already published
+        await server.db.mood_entries.insert_one({**entry, "id": "second"})
+        await asyncio.sleep(0.05)
+        poller.cancel()
+
+    run_feed(monkeypatch, scenario)
+
+    assert published == ["first", "second"]
+
+
+def test_follow_polls_when_change_streams_cannot_be_opened(monkeypatch):
+    polled = []
+
+    def watch(pipeline):
+        raise TypeError("watch() is not supported")
+
+    async def poll():
+        polled.append(1)
+
+    monkeypatch.setattr(server, "db", SimpleNamespace(watch=watch))
+    broadcaster = server.ChangeFeedBroadcaster()
+    monkeypatch.setattr(broadcaster, "poll", poll)
+
+    asyncio.run(broadcaster.follow())
+
+    assert polled == [1]
+
+
+def test_follow_lets_run_retry_when_an_open_stream_fails(monkeypatch):
+    async def watch():
+        broadcaster.watching = True
+        raise RuntimeError("cursor killed")
+
+    async def poll():
+        raise AssertionError("should retry the change stream, not poll")
+
+    broadcaster = server.ChangeFeedBroadcaster()
+    monkeypatch.setattr(broadcaster, "watch", watch)
+    monkeypatch.setattr(broadcaster, "poll", poll)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(broadcaster.follow())
+
+
+def test_stream_requires_the_users_own_token(client):
+    user = create_user(client).json()
+    other = create_user(client, email="other@example.fr").json()
+    headers = {"Authorization": f"Bearer {login(client).json()['access_token']}"}
+
+    assert client.get(f"/api/mood/{user['id']}/stream").status_code == 401
+    assert client.get(f"/api/mood/{other['id']}/stream", headers=headers).status_code == 403
+
+
+def test_stream_delivers_posted_mood_entries(client, monkeypatch):
+    monkeypatch.setattr(server, "FEED_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(server, "FEED_COALESCE_WINDOW", 0.01)
+    user = create_user(client).json()
+    token = login(client).json()["access_token"]
+    subscribed = threading.Event()
+
+    async def read_delta():
+        # TestClient buffers whole responses, so the endless stream is driven through ASGI directly
+        disconnected = asyncio.Event()
+        received = []
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] != "http.response.body" or not message.get("body"):
+                return
+            if message["body"].startswith(b"retry:"):
+                subscribed.set()
+            elif message["body"].startswith(b"event: delta"):
+                received.append(message["body"])
+                disconnected.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/api/mood/{user['id']}/stream", "raw_path": b"", "root_path": "",
+            "query_string": b"", "server": ("testserver", 80), "client": ("testclient", 50000),
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+        await asyncio.wait_for(server.app(scope, receive, send), timeout=5)
+        return received
+
+    stream = client.portal.start_task_soon(read_delta)
+    assert subscribed.wait(timeout=5)
+    time.sleep(0.1)  # let the broadcaster fall back to polling and take its starting timestamp
+    assert client.post("/api/mood", json={"user_id": user["id"], "mood": "calm", "intensity": 4}).status_code == 200
+
+    [payload] = stream.result(timeout=5)
+    event, delta = parse_event(payload)
+    assert event == "delta"
+    assert [(entry["mood"], entry["intensity"]) for entry in delta["mood_entries"]] == [("calm", 4)]
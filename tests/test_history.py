@@ -0,0 +1,68 @@
+import uuid
+
+
+def log_moods(client, user_id, count=3):
+    for intensity in range(1, count + 1):
+        response = client.post("/api/mood", json={"user_id": user_id, "mood": "calm", "intensity": intensity})
+        assert response.status_code == 200
+
+
+def test_mood_history_returns_etag_and_304_when_unchanged(client):
+    user_id = str(uuid.uuid4())
+    log_moods(client, user_id)
+
+    first = client.get(f"/api/mood/{user_id}")
+    assert first.status_code == 200
+    assert len(first.json()) == 3
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    assert client.get(f"/api/mood/{user_id}", headers={"If-None-Match": etag}).status_code == 304
+    # nginx rewrites ETags as weak when it compresses; both forms must match
+    assert client.get(f"/api/mood/{user_id}", headers={"If-None-Match": etag[2:]}).status_code == 304
+    assert client.get(f"/api/mood/{user_id}", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_mood_history_etag_changes_with_new_entries(client):
+    user_id = str(uuid.uuid4())
+    log_moods(client, user_id)
+    etag = client.get(f"/api/mood/{user_id}").headers["etag"]
+
+    log_moods(client, user_id, count=1)
+    response = client.get(f"/api/mood/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+
+
+def test_chat_history_respects_refused_encodings(client, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "COMPRESSION_MIN_SIZE", 0)
+    session_id = f"session-{uuid.uuid4().hex}"
+    client.post("/api/chat", json={
+        "user_id": "user", "session_id": session_id, "message": "Bonjour",
+        "current_mood": "sad", "mood_intensity": 5
+    })
+
+    compressed = client.get(f"/api/chat/{session_id}", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json()[0]["user_message"] == "Bonjour"
+
+    refused = client.get(f"/api/chat/{session_id}", headers={"Accept-Encoding": "br;q=0, gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+    assert refused.json()[0]["session_id"] == session_id
+
+
+def test_chat_history_prefers_brotli(client, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "COMPRESSION_MIN_SIZE", 0)
+    session_id = f"session-{uuid.uuid4().hex}"
+    client.post("/api/chat", json={
+        "user_id": "user", "session_id": session_id, "message": "Bonjour",
+        "current_mood": "calm", "mood_intensity": 2
+    })
+
+    response = client.get(f"/api/chat/{session_id}", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.json()[0]["session_id"] == session_id
@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import server
+
+# Output of the original hard-coded French implementation, before the locale catalogs
+FRENCH_BASELINE = json.loads((Path(__file__).parent / "data" / "french_baseline.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("case", FRENCH_BASELINE)
+def test_french_output_is_unchanged(case):
+    if case["function"] == "system_message":
+        actual = server.get_emotional_system_message(case["mood"], case["intensity"])
+    elif case["function"] == "fallback":
+        actual = server.get_fallback_emotional_response(case["mood"], case["intensity"], case["message"])
+    else:
+        actual = server.get_chat_fallback_response(case["message"], case["mood"], case["intensity"])
+    assert actual == case["expected"]
+
+
+@pytest.mark.parametrize("locale", sorted(server.SUPPORTED_LOCALES))
+def test_catalogs_cover_every_mood(locale):
+    catalog = server.LOCALE_CATALOGS[locale]
+    assert set(catalog["guidance"]) == set(server.SUPPORTED_MOODS)
+    assert set(catalog["fallback"]) == set(server.SUPPORTED_MOODS)
+    assert all(len(responses) == 3 for responses in catalog["fallback"].values())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("en-US,en;q=0.9", "en"),
+    ("de-DE,es;q=0.5,ar;q=0.8", "ar"),
+    ("ES_mx", "es"),
+    ("en;q=0, fr;q=0.1", "fr"),
+    ("de", None),
+    ("", None),
+])
+def test_resolve_locale(header, expected):
+    assert server.resolve_locale(header) == expected
+
+
+def test_unsupported_locales_fall_through_to_next_source():
+    german_user = server.User(email="a@example.fr", name="A", locale="de")
+
+    assert server.choose_locale("de", None, "es-ES") == "es"
+    assert server.choose_locale(None, german_user, "en") == "en"
+    assert server.choose_locale(None, german_user, None) == server.DEFAULT_LOCALE
+    assert server.choose_locale("ar", german_user, "en") == "ar"
+
+
+def test_unsupported_locale_is_not_saved(client):
+    user = client.post("/api/users", json={"name": "A", "email": "a@example.fr", "locale": "de"}).json()
+    assert user["locale"] is None
+
+    user = client.post("/api/users", json={"name": "B", "email": "b@example.fr", "locale": "es-MX"}).json()
+    assert user["locale"] == "es"
+
+
+def test_accept_language_selects_fallback_language(client):
+    response = client.post(
+        "/api/ai-response",
+        json={"user_id": "u", "mood": "sad", "intensity": 2},
+        headers={"Accept-Language": "en-GB,en;q=0.9"}
+    )
+    assert response.json()["ai_response"] == server.LOCALE_CATALOGS["en"]["fallback"]["sad"][0]
@@ -0,0 +1,26 @@
+import server
+
+
+def test_profiled_requests_are_grouped_by_route_template(client, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(server, "profiler", server.Profiler())
+    server.profiler.enabled = True
+    headers = {"X-Profile": "1"}
+
+    for session_id in ("session-1-abc", "session-2-def"):
+        response = client.post("/api/chat", headers=headers, json={
+            "user_id": "u", "session_id": session_id, "message": "Bonjour",
+            "current_mood": "sad", "mood_intensity": 5
+        })
+        assert "fallback;dur=" in response.headers["server-timing"]
+        client.get(f"/api/chat/{session_id}", headers=headers)
+
+    collapsed = client.get("/api/admin/profiling/collapsed", headers={"X-Admin-Token": "admin-secret"}).text
+    roots = {line.rsplit(" ", 1)[0].split(";")[0] for line in collapsed.splitlines()}
+    assert roots == {"POST /api/chat", "GET /api/chat/{session_id}"}
+    assert any(line.startswith("POST /api/chat;insert_one ") for line in collapsed.splitlines())
+    assert server.profiler.profiled_requests == 4
+
+
+def test_span_is_a_no_op_when_not_profiling():
+    assert server.span("llm_call") is server.span("insert_one")
@@ -0,0 +1,123 @@
+import asyncio
+import io
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+import replay_traffic
+import server
+
+USER_ID = "3f2b8c1e-9a4d-4e6f-8b7a-1c2d3e4f5a6b"
+
+
+def results(p95_ms, throughput_rps, route="POST /api/chat"):
+    timings = {"p50_ms": p95_ms / 2, "p95_ms": p95_ms, "p99_ms": p95_ms * 2}
+    return {
+        "summary": {"throughput_rps": throughput_rps, **timings},
+        "routes": {route: timings},
+    }
+
+
+def test_sanitize_payload_redacts_personal_fields_and_keeps_lengths():
+    payload = {
+        "email": "Alice@Example.com",
+        "mood": "sad",
+        "intensity": 7,
+        "history": [{"message": "Je suis triste", "user_id": USER_ID}],
+    }
+
+    sanitized = server.sanitize_payload(payload)
+
+    assert sanitized["email"] == "<redacted:17>"
+    assert sanitized["mood"] == "sad"
+    assert sanitized["intensity"] == 7
+    assert sanitized["history"][0]["message"] == "<redacted:14>"
+    assert sanitized["history"][0]["user_id"] != USER_ID
+
+
+def test_pseudonymize_ids_is_stable_and_keeps_uuid_format():
+    path = f"/api/mood/{USER_ID}"
+
+    first = server.pseudonymize_ids(path)
+
+    assert first == server.pseudonymize_ids(path)
+    assert first == server.pseudonymize_ids(f"/api/mood/{USER_ID.upper()}")
+    assert USER_ID not in first
+    uuid.UUID(first.rsplit("/", 1)[1])
+    assert server.pseudonymize_ids(f"/api/mood/{uuid.uuid4()}") != first
+
+
+def test_restore_payload_fills_redactions_with_same_length_text():
+    restored = replay_traffic.restore_payload({
+        "message": "<redacted:150>",
+        "history": [{"message": "<redacted:3>"}],
+        "mood": "sad",
+    })
+
+    assert len(restored["message"]) == 150
+    assert len(restored["history"][0]["message"]) == 3
+    assert restored["mood"] == "sad"
+
+
+def test_restore_payload_gives_every_profile_a_unique_email():
+    emails = {replay_traffic.restore_payload({"email": "<redacted:17>"})["email"] for _ in range(3)}
+    assert len(emails) == 3
+
+
+def test_compare_flags_p95_regressions_and_throughput_drops(capsys):
+    baseline = results(p95_ms=100, throughput_rps=50)
+
+    assert replay_traffic.compare(baseline, results(p95_ms=105, throughput_rps=49), threshold=10) == []
+    assert replay_traffic.compare(baseline, results(p95_ms=150, throughput_rps=50), threshold=10) == [
+        "ALL", "POST /api/chat"
+    ]
+    assert replay_traffic.compare(baseline, results(p95_ms=100, throughput_rps=40), threshold=10) == ["throughput"]
+
+
+def test_streaming_requests_are_not_replayed():
+    assert replay_traffic.is_streaming({"path": f"/api/mood/{USER_ID}/stream"})
+    assert not replay_traffic.is_streaming({"path": f"/api/mood/{USER_ID}"})
+
+
+def test_reset_database_refuses_non_replay_databases():
+    dropped = []
+
+    async def drop_database(name):
+        dropped.append(name)
+
+    fake_server = SimpleNamespace(
+        db=SimpleNamespace(name="test_database"),
+        client=SimpleNamespace(drop_database=drop_database),
+    )
+    with pytest.raises(RuntimeError):
+        asyncio.run(replay_traffic.reset_database(fake_server))
+
+    fake_server.db.name = replay_traffic.REPLAY_DB_NAME
+    asyncio.run(replay_traffic.reset_database(fake_server))
+    assert dropped == [replay_traffic.REPLAY_DB_NAME]
+
+
+def record(path, response):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def call_next(request):
+        return response
+
+    request = Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}, receive)
+    return asyncio.run(server.record_traffic(request, call_next))
+
+
+def test_recorder_skips_event_streams(monkeypatch):
+    log = io.StringIO()
+    monkeypatch.setattr(server.app.state, "traffic_log", log, raising=False)
+
+    record(f"/api/mood/{USER_ID}/stream", StreamingResponse(iter(()), media_type="text/event-stream"))
+    assert log.getvalue() == ""
+
+    record(f"/api/mood/{USER_ID}", JSONResponse([]))
+    assert json.loads(log.getvalue())["path"] == server.pseudonymize_ids(f"/api/mood/{USER_ID}")
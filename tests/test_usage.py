@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+
+import pytest
+
+import server
+
+ADMIN = {"X-Admin-Token": "admin-secret"}
+REPLY = "Respire profondément, je suis là."
+
+
+class FakeLlmChat:
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        pass
+
+    def with_model(self, provider, model):
+        return self
+
+    def with_max_tokens(self, max_tokens):
+        return self
+
+    async def send_message(self, user_message):
+        return REPLY
+
+
+class FakeUserMessage:
+    def __init__(self, text):
+        self.text = text
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(server, "usage_tracker", server.UsageTracker())
+    return server.usage_tracker
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(server, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(server, "LlmChat", FakeLlmChat)
+    monkeypatch.setattr(server, "UserMessage", FakeUserMessage)
+
+
+def test_usage_requires_admin_token(client, tracker):
+    assert client.get("/api/usage/user").status_code == 403
+    assert client.get("/api/usage/user", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/usage/user", headers=ADMIN).status_code == 200
+
+
+def test_usage_mood_key_is_case_insensitive(client, tracker):
+    tracker.record("chat", "user-1", "Sad", 120, 30)
+
+    response = client.get("/api/usage/mood", params={"key": "Sad"}, headers=ADMIN)
+    assert response.status_code == 200
+    assert response.json() == [{
+        "key": "sad", "calls": 1, "prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150
+    }]
+
+
+def test_llm_calls_are_recorded_per_endpoint(client, tracker, llm):
+    client.post("/api/ai-response", json={"user_id": "alice", "mood": "sad", "intensity": 4, "message": "Dur"})
+    client.post("/api/chat", json={
+        "user_id": "alice", "session_id": "s1", "message": "Bonjour", "current_mood": "Calm", "mood_intensity": 2
+    })
+
+    assert set(tracker.pending) == {("ai-response", "alice", "sad"), ("chat", "alice", "calm")}
+    chat = tracker.pending[("chat", "alice", "calm")]
+    system_message = server.get_emotional_system_message("Calm", 2)
+    assert chat == {
+        "calls": 1,
+        "prompt_tokens": server.count_prompt_tokens(system_message, "Bonjour"),
+        "completion_tokens": server.count_tokens(REPLY),
+    }
+    users = client.get("/api/usage/user", headers=ADMIN).json()
+    assert [(row["key"], row["calls"]) for row in users] == [("alice", 2)]
+
+
+def test_fallback_responses_are_not_recorded(client, tracker):
+    client.post("/api/chat", json={
+        "user_id": "alice", "session_id": "s1", "message": "Bonjour", "current_mood": "calm", "mood_intensity": 2
+    })
+    assert not tracker.pending
+
+
+def test_pooled_responses_are_charged_to_the_served_user(client, tracker, llm, monkeypatch):
+    pool = server.WarmResponsePool()
+    monkeypatch.setattr(server, "warm_pool", pool)
+    pool.pools[("sad", "low", "fr")].append((server.time.monotonic(), "Réponse préparée", 90, 15))
+
+    response = client.post("/api/ai-response", json={"user_id": "bob", "mood": "sad", "intensity": 2})
+
+    assert response.json()["ai_response"] == "Réponse préparée"
+    assert tracker.pending[("ai-response", "bob", "sad")] == {"calls": 1, "prompt_tokens": 90, "completion_tokens": 15}
+
+
+def test_unserved_pool_responses_are_not_listed_as_a_user(client, tracker):
+    tracker.record("warm-pool", None, "sad", 90, 15)
+
+    assert client.get("/api/usage/user", headers=ADMIN).json() == []
+    endpoints = client.get("/api/usage/endpoint", headers=ADMIN).json()
+    assert [(row["key"], row["total_tokens"]) for row in endpoints] == [("warm-pool", 105)]
+
+
+def test_flush_upserts_increments(client, tracker):
+    tracker.record("chat", "alice", "sad", 100, 10)
+    client.portal.call(tracker.flush)
+    tracker.record("chat", "alice", "sad", 50, 5)
+    client.portal.call(tracker.flush)
+
+    documents = client.portal.call(lambda: server.db.usage.find({}, {"_id": 0, "updated_at": 0}).to_list(None))
+    assert documents == [{
+        "endpoint": "chat", "user_id": "alice", "mood": "sad",
+        "calls": 2, "prompt_tokens": 150, "completion_tokens": 15
+    }]
+    assert not tracker.pending
+
+
+def test_flush_keeps_counters_when_mongo_fails(client, tracker, monkeypatch):
+    async def failing_bulk_write(*args, **kwargs):
+        raise RuntimeError("mongo down")
+
+    monkeypatch.setattr(server, "db", SimpleNamespace(usage=SimpleNamespace(bulk_write=failing_bulk_write)))
+    tracker.record("chat", "alice", "sad", 100, 10)
+    client.portal.call(tracker.flush)
+    tracker.record("chat", "alice", "sad", 50, 5)
+
+    assert tracker.pending[("chat", "alice", "sad")] == {"calls": 2, "prompt_tokens": 150, "completion_tokens": 15}
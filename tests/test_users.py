@@ -0,0 +1,55 @@
+def create_user(client, email="marie.dubois@example.fr", password="s3cret-pass"):
+    return client.post("/api/users", json={"name": "Marie Dubois", "email": email, "password": password})
+
+
+def login(client, email="marie.dubois@example.fr", password="s3cret-pass"):
+    return client.post("/api/login", json={"email": email, "password": password})
+
+
+def test_duplicate_email_returns_409(client):
+    assert create_user(client).status_code == 200
+
+    response = create_user(client, email="  Marie.Dubois@Example.fr ")
+    assert response.status_code == 409
+
+
+def test_created_user_does_not_expose_password_hash(client):
+    user = create_user(client).json()
+
+    assert "password_hash" not in user
+    assert "password_hash" not in client.get(f"/api/users/{user['id']}").json()
+
+
+def test_login_issues_token(client):
+    user = create_user(client).json()
+
+    response = login(client)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["token_type"] == "bearer"
+    assert data["access_token"]
+    assert data["user"]["id"] == user["id"]
+
+
+def test_login_rejects_wrong_password_and_unknown_email(client):
+    create_user(client)
+
+    assert login(client, password="wrong").status_code == 401
+    assert login(client, email="nobody@example.fr").status_code == 401
+
+
+def test_token_must_match_user_id(client):
+    user = create_user(client).json()
+    other = create_user(client, email="other@example.fr").json()
+    headers = {"Authorization": f"Bearer {login(client).json()['access_token']}"}
+    chat = {"session_id": "session-1", "message": "Bonjour", "current_mood": "calm", "mood_intensity": 3}
+
+    assert client.post("/api/chat", json={**chat, "user_id": other["id"]}, headers=headers).status_code == 403
+    assert client.post("/api/chat", json={**chat, "user_id": user["id"]}, headers=headers).status_code == 200
+
+
+def test_invalid_token_returns_401(client):
+    headers = {"Authorization": "Bearer not-a-token"}
+    chat = {"user_id": "u", "session_id": "s", "message": "Bonjour", "current_mood": "calm", "mood_intensity": 3}
+
+    assert client.post("/api/chat", json=chat, headers=headers).status_code == 401
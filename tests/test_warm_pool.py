@@ -0,0 +1,105 @@
+import asyncio
+
+import server
+
+
+def make_pool(monkeypatch, generated):
+    pool = server.WarmResponsePool()
+
+    async def generate(mood, bucket, locale):
+        generated.append((mood, bucket, locale))
+        return f"{mood}-{bucket}-{len(generated)}", 100, 20
+
+    monkeypatch.setattr(pool, "generate", generate)
+    return pool
+
+
+def test_refill_makes_no_calls_without_demand(monkeypatch):
+    generated = []
+    pool = make_pool(monkeypatch, generated)
+
+    asyncio.run(pool.refill())
+
+    assert generated == []
+
+
+def test_refill_only_generates_for_drawn_pools(monkeypatch):
+    generated = []
+    pool = make_pool(monkeypatch, generated)
+
+    assert pool.take("Sad", 8) is None
+    asyncio.run(pool.refill())
+
+    assert set(generated) == {("sad", "high", server.DEFAULT_LOCALE)}
+    assert pool.take("sad", 9) == ("sad-high-1", 100, 20)
+
+
+def test_pools_without_recent_demand_are_dropped(monkeypatch):
+    generated = []
+    pool = make_pool(monkeypatch, generated)
+    pool.take("calm", 2)
+    asyncio.run(pool.refill())
+
+    monkeypatch.setattr(server, "WARM_POOL_DEMAND_WINDOW", 0)
+    asyncio.run(pool.refill())
+
+    assert pool.take("calm", 2) is None
+    assert len(generated) == server.WARM_POOL_SIZE
+
+
+def test_backoff_grows_after_failures(monkeypatch):
+    pool = server.WarmResponsePool()
+    assert pool.next_delay() == server.WARM_POOL_INTERVAL
+
+    pool.failures = 3
+    assert pool.next_delay() == server.WARM_POOL_INTERVAL * 8
+
+    pool.failures = 50
+    assert pool.next_delay() == server.WARM_POOL_MAX_BACKOFF
+
+
+def test_warm_up_fills_every_mood_and_bucket_once(monkeypatch):
+    generated = []
+    pool = make_pool(monkeypatch, generated)
+    monkeypatch.setattr(server, "WARM_POOL_LOCALES", ("fr", "en"))
+    monkeypatch.setattr(server, "WARM_POOL_SIZE", 1)
+
+    pool.warm_up()
+    asyncio.run(pool.refill())
+
+    expected = {
+        (mood, bucket, locale)
+        for mood in server.SUPPORTED_MOODS for bucket in server.INTENSITY_BUCKETS for locale in ("fr", "en")
+    }
+    assert set(generated) == expected
+    assert len(generated) == len(expected)
+    assert pool.take("happy", 5, "en") is not None
+
+
+def test_warmed_pools_still_expire_without_demand(monkeypatch):
+    generated = []
+    pool = make_pool(monkeypatch, generated)
+    pool.warm_up()
+    monkeypatch.setattr(server, "WARM_POOL_DEMAND_WINDOW", 0)
+
+    asyncio.run(pool.refill())
+
+    assert generated == []
+    assert pool.last_drawn == {}
+
+
+def test_failing_generation_does_not_block_other_pools(monkeypatch):
+    pool = server.WarmResponsePool()
+
+    async def generate(mood, bucket, locale):
+        if mood == "sad":
+            raise RuntimeError("provider timeout")
+        return f"{mood}-{bucket}", 100, 20
+
+    monkeypatch.setattr(pool, "generate", generate)
+    pool.take("sad", 8)
+    pool.take("calm", 2)
+
+    assert asyncio.run(pool.refill()) is False
+    assert pool.take("calm", 2) == ("calm-low", 100, 20)
+    assert pool.take("sad", 8) is None